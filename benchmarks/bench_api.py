@@ -0,0 +1,187 @@
+# benchmarks/bench_api.py
+# Charge du service dwh_api : N clients simultanés (une connexion HTTP gardée ouverte chacun)
+# enchaînent des requêtes tirées d'un mélange de découpages (/comptes) et d'extractions
+# (/faits, JSON et CSV), construit à partir des années, écoles, matières et pays présents
+# dans le DWH. Par niveau de concurrence : latences p50 / p90 / p99 / max, requêtes/s,
+# erreurs et part des réponses servies sans requête SQL (cache, ou requête identique en cours).
+# Par défaut le service est lancé (sous-processus) deux fois, sans cache puis avec cache, sur
+# le DWH de DATABASE_URL (--dsn pour un autre) ; --url : service déjà lancé, mesuré tel quel.
+# Usage : python benchmarks/bench_api.py [--concurrency 1 8 32] [--requests 2000] [--url http://127.0.0.1:8080]
+import os, sys, json, time, random, socket, asyncio, argparse, platform, subprocess
+from urllib.parse import urlsplit, urlencode
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import dwh_api
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_api.json")
+START_TIMEOUT = 30
+FAITS_LIMIT = 500
+
+async def fetch(reader, writer, path):
+    """GET sur une connexion ouverte ; (statut, en-têtes, octets du corps)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        return status, headers, len(await reader.readexactly(int(headers["content-length"])))
+    size = 0
+    while (n := int(await reader.readline(), 16)):
+        size += len(await reader.readexactly(n))
+        await reader.readline()
+    await reader.readline()
+    return status, headers, size
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    if b"chunked" in head.lower():   # corps chunked : on recolle les morceaux
+        out, rest = b"", body
+        while True:
+            size, _, rest = rest.partition(b"\r\n")
+            if not int(size, 16):
+                break
+            out, rest = out + rest[:int(size, 16)], rest[int(size, 16) + 2:]
+        body = out
+    return json.loads(body)
+
+async def request_mix(host, port, seed):
+    """Générateur de chemins : découpages et extractions sur des valeurs réelles du DWH."""
+    values = {}
+    for cut in ("annee", "ecole", "matiere", "pays"):
+        rows = await get_json(host, port, f"/comptes?par={cut}")
+        values[cut] = [r[cut] for r in rows if r[cut] is not None]
+    rng = random.Random(seed)
+    pick = lambda cut: rng.choice(values[cut])
+    mix = [
+        lambda: {"par": "annee"},
+        lambda: {"par": "annee,ecole"},
+        lambda: {"par": "annee,pays", "annee": pick("annee")},
+        lambda: {"par": "matiere", "annee": pick("annee")},
+        lambda: {"par": "ecole,matiere", "annee": pick("annee")},
+        lambda: {"par": "pays", "matiere": pick("matiere")},
+        lambda: ("/faits", {"annee": pick("annee"), "ecole": pick("ecole"), "limit": FAITS_LIMIT}),
+        lambda: ("/faits", {"annee": pick("annee"), "matiere": pick("matiere"), "format": "csv", "limit": FAITS_LIMIT}),
+    ]
+    def next_path():
+        spec = rng.choice(mix)()
+        path, params = spec if isinstance(spec, tuple) else ("/comptes", spec)
+        return f"{path}?{urlencode(params)}"
+    return next_path, {k: len(v) for k, v in values.items()}
+
+async def run_level(host, port, concurrency, total, next_path):
+    latencies, served, errors, size = [], {}, 0, 0
+    remaining = [total]
+
+    async def client():
+        nonlocal errors, size
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                path = next_path()
+                t0 = time.perf_counter()
+                status, headers, n = await fetch(reader, writer, path)
+                latencies.append(time.perf_counter() - t0)
+                size += n
+                if status != 200:
+                    errors += 1
+                state = headers.get("x-cache", "-")
+                served[state] = served.get(state, 0) + 1
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    ms = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {"concurrency": concurrency, "requests": len(ms), "wall_s": round(wall, 3),
+            "req_per_s": round(len(ms) / wall, 1), "p50_ms": round(p50, 2), "p90_ms": round(p90, 2),
+            "p99_ms": round(p99, 2), "max_ms": round(ms.max(), 2), "errors": errors,
+            "sans_sql": round((served.get("hit", 0) + served.get("shared", 0)) / len(ms), 4),
+            "reponses": served, "octets": size}
+
+async def measure(host, port, args):
+    next_path, values = await request_mix(host, port, args.seed)
+    runs = []
+    for c in args.concurrency:
+        res = await run_level(host, port, c, args.requests, next_path)
+        runs.append(res)
+        print(f"      {c:>4} client(s)  {res['req_per_s']:>8,.1f} req/s  p50 {res['p50_ms']:7.2f} ms  "
+              f"p90 {res['p90_ms']:7.2f} ms  p99 {res['p99_ms']:7.2f} ms  max {res['max_ms']:8.2f} ms  "
+              f"sans SQL {res['sans_sql']:6.1%}  erreurs {res['errors']}")
+    return {"valeurs": values, "runs": runs}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def wait_ready(host, port, proc):
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"❌ dwh_api s'est arrêté (code {proc.returncode})")
+        try:
+            return await get_json(host, port, "/sante")
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise SystemExit("❌ dwh_api ne répond pas")
+
+async def with_service(extra, args):
+    """Lance dwh_api sur un port libre, mesure, l'arrête."""
+    port = free_port()
+    env = dict(os.environ, **({"DATABASE_URL": args.dsn} if args.dsn else {}))
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "dwh_api.py"), "--port", str(port),
+                             "--pool", str(args.pool), *extra], env=env, stdout=subprocess.DEVNULL)
+    try:
+        await wait_ready("127.0.0.1", port, proc)
+        return await measure("127.0.0.1", port, args)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+async def run(args):
+    if args.url:
+        url = urlsplit(args.url)
+        print(f"   service {args.url}")
+        return {"service": args.url, **await measure(url.hostname, url.port or 80, args)}
+    results = {}
+    for label, extra in (("sans_cache", ["--cache-entries", "0"]), ("cache", [])):
+        print(f"   {label.replace('_', ' ')} (pool {args.pool})")
+        results[label] = await with_service(extra, args)
+    return results
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--requests", type=int, default=2000, help="requêtes par niveau de concurrence")
+    ap.add_argument("--pool", type=int, default=dwh_api.POOL_SIZE)
+    ap.add_argument("--url", help="service déjà lancé (sinon lancé ici, sans puis avec cache)")
+    ap.add_argument("--dsn", help="DWH mesuré (défaut : DATABASE_URL)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    results = asyncio.run(run(args))
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+                   "platform": platform.platform(), "requests": args.requests, "seed": args.seed,
+                   "results": results}, f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_dimension_matiere.py
+# Compare l'étape dimension_matiere de build_dwh : ancienne version (fetchall + 1 INSERT
+# RETURNING par élève-année + executemany) et version ensembliste (MATIERE_SQL).
+# Tourne dans des schémas jetables bench_ods / bench_dwh (ods / dwh ne sont pas touchés).
+# Usage : python benchmarks/bench_dimension_matiere.py [--sizes 10000 100000 1000000] [--timeout 600]
+import os, sys, json, time, argparse, platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import psycopg
+import build_dwh
+from scratch_dwh import scratch, make_source, build_dimensions, drop
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_dimension_matiere.json")
+
+def reset(cur):
+    cur.execute("TRUNCATE bench_dwh.dimension_matiere RESTART IDENTITY CASCADE; DROP TABLE IF EXISTS _map_matiere;")
+
+def run_rowwise(cur, deadline):
+    """Ancienne étape : agrégation récupérée côté client puis 2 aller-retours par élève-année."""
+    cur.execute(scratch("""
+        WITH b AS (
+          SELECT de.id_etudiant, o.annee, TRIM(x) AS mat
+          FROM ods.etudiants_clean o
+          JOIN dwh.dimension_etudiant de
+            ON de.nom=o.nom AND de.prenom=o.prenom
+           AND (de.date_naissance IS NOT DISTINCT FROM o.date_naissance)
+          CROSS JOIN LATERAL regexp_split_to_table(COALESCE(o.matiere,''), '\\s*;\\s*') x
+          WHERE o.annee IS NOT NULL AND COALESCE(x,'') <> ''
+        ),
+        agg AS (
+          SELECT id_etudiant, annee,
+                 ARRAY(SELECT DISTINCT m2.mat FROM b m2
+                       WHERE m2.id_etudiant=b.id_etudiant AND m2.annee=b.annee ORDER BY m2.mat) AS mats
+          FROM b GROUP BY id_etudiant, annee
+        )
+        SELECT id_etudiant, annee, array_to_string(mats, '; ') FROM agg ORDER BY id_etudiant, annee;
+    """))
+    rows = cur.fetchall()
+    mapping = []
+    for i, (id_etudiant, annee, mat_text) in enumerate(rows):
+        if i % 1000 == 0 and time.monotonic() > deadline:
+            raise TimeoutError
+        cur.execute("INSERT INTO bench_dwh.dimension_matiere (nom_matiere) VALUES (%s) RETURNING id_matiere;",
+                    (mat_text if mat_text else None,))
+        mapping.append((id_etudiant, annee, cur.fetchone()[0]))
+    cur.execute("CREATE TEMP TABLE _map_matiere(id_etudiant BIGINT, annee INT, id_matiere BIGINT) ON COMMIT PRESERVE ROWS;")
+    cur.executemany("INSERT INTO _map_matiere(id_etudiant, annee, id_matiere) VALUES (%s,%s,%s);", mapping)
+
+def run_setbased(cur, deadline):
+    cur.execute(scratch(build_dwh.ODS_FAIT_SQL))
+    cur.execute(scratch(build_dwh.MATIERE_SQL))
+
+def snapshot(cur):
+    cur.execute("""SELECT COUNT(*), md5(string_agg(m.id_etudiant || '|' || m.annee || '|' || d.id_matiere || '|'
+                                               || COALESCE(d.nom_matiere, ''), ',' ORDER BY d.id_matiere))
+                   FROM _map_matiere m JOIN bench_dwh.dimension_matiere d USING (id_matiere)""")
+    return cur.fetchone()
+
+def timed(cur, fn, timeout):
+    reset(cur)
+    cur.execute(f"SET statement_timeout = '{int(timeout)}s'")
+    t0 = time.perf_counter()
+    try:
+        fn(cur, time.monotonic() + timeout)
+    except (TimeoutError, psycopg.errors.QueryCanceled):
+        return None, None
+    finally:
+        cur.execute("RESET statement_timeout")
+    return time.perf_counter() - t0, snapshot(cur)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--timeout", type=float, default=600, help="secondes max par exécution (ancienne version)")
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    results = []
+    with psycopg.connect(build_dwh.DATABASE_URL, autocommit=True) as conn:
+        cur = conn.cursor()
+        for n in args.sizes:
+            make_source(cur, n)
+            build_dimensions(cur)
+            before, ref = timed(cur, run_rowwise, args.timeout)
+            after, new = timed(cur, run_setbased, args.timeout)
+            same = None if ref is None else ref == new
+            results.append({"eleves_annees": n, "lignes_dimension": new[0],
+                            "avant_s": None if before is None else round(before, 3), "apres_s": round(after, 3),
+                            "speedup": None if before is None else round(before / after, 1),
+                            "resultat_identique": same})
+            avant = f"{before:8.2f}s" if before is not None else f" >{args.timeout:.0f}s (interrompu)"
+            print(f"   {n:>9,} élèves-années  avant {avant}  après {after:7.2f}s  identique={same}")
+        drop(cur)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"timeout_s": args.timeout, "python": platform.python_version(), "cpu_count": os.cpu_count(),
+                   "results": results}, f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+
+if __name__ == "__main__":
+    main()
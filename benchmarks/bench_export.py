@@ -0,0 +1,92 @@
+# benchmarks/bench_export.py
+# Compare l'export CSV (COPY TO en flux) et l'export Parquet partitionné par annee de
+# export_dwh_to_csv : durée d'export, taille sur disque, puis lectures côté BI (vue aplatie
+# complète, une seule année, toutes les dimensions).
+# Tourne dans des schémas jetables bench_ods / bench_dwh (ods / dwh ne sont pas touchés).
+# Usage : python benchmarks/bench_export.py [--sizes 100000 1000000] [--repeat 3]
+import os, sys, json, time, shutil, argparse, platform, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd
+import pyarrow.parquet as pq
+import psycopg
+import build_dwh
+import export_dwh_to_csv as exp
+from scratch_dwh import scratch, make_source, build_dimensions, build_facts, build_materialized, drop
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_export.json")
+DIMENSIONS = [t.split(".")[-1] for t in exp.TABLES if ".dimension_" in t]
+
+def dir_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return round(min(times), 3)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    tables = [scratch(t) for t in exp.TABLES]
+    results = []
+    for n in args.sizes:
+        with psycopg.connect(build_dwh.DATABASE_URL, autocommit=True) as conn:
+            cur = conn.cursor()
+            make_source(cur, n)
+            build_dimensions(cur)
+            build_facts(cur, build_dwh.ods_years(cur, "bench_ods.etudiants_clean"))
+            build_materialized(cur)
+            year = cur.execute("SELECT MAX(annee) FROM bench_dwh.fait_annee").fetchone()[0]
+
+        tmp = tempfile.mkdtemp(prefix="bench_export_")
+        try:
+            csv_dir, pq_dir = os.path.join(tmp, "csv"), os.path.join(tmp, "pq")
+            res = {"eleves_annees": n, "annee_filtree": year}
+            for fmt, out in (("csv", csv_dir), ("parquet", pq_dir)):
+                res[f"export_{fmt}_s"] = best(lambda: exp.export(out, fmt, tables=tables, flat_sql=scratch(exp.FLAT_SQL)),
+                                              args.repeat)
+            pq_dir = os.path.join(pq_dir, exp.PARQUET_DIR)
+            flat_csv, flat_pq = os.path.join(csv_dir, "dwh_flat.csv"), os.path.join(pq_dir, "dwh_flat.parquet")
+            res["taille_csv_mo"] = round(sum(dir_size(os.path.join(csv_dir, f)) for f in os.listdir(csv_dir)) / 2**20, 1)
+            res["taille_parquet_mo"] = round(dir_size(pq_dir) / 2**20, 1)
+
+            reads = {
+                "vue_aplatie": (lambda: pd.read_csv(flat_csv),
+                                lambda: pq.read_table(flat_pq).to_pandas()),
+                "une_annee": (lambda: (lambda df: df[df["annee"] == year])(pd.read_csv(flat_csv)),
+                              lambda: pq.read_table(flat_pq, filters=[("annee", "=", year)]).to_pandas()),
+                "dimensions": (lambda: [pd.read_csv(os.path.join(csv_dir, d + ".csv")) for d in DIMENSIONS],
+                               lambda: [pq.read_table(os.path.join(pq_dir, d + ".parquet")).to_pandas() for d in DIMENSIONS]),
+            }
+            for name, (read_csv, read_pq) in reads.items():
+                res[f"lecture_{name}_csv_s"] = best(read_csv, args.repeat)
+                res[f"lecture_{name}_parquet_s"] = best(read_pq, args.repeat)
+            results.append(res)
+            print(f"   {n:>9,} élèves-années  export csv {res['export_csv_s']:.2f}s / parquet {res['export_parquet_s']:.2f}s"
+                  f"  taille {res['taille_csv_mo']} / {res['taille_parquet_mo']} Mo")
+            for name in reads:
+                print(f"      lecture {name:<12} csv {res[f'lecture_{name}_csv_s']:7.3f}s"
+                      f"  parquet {res[f'lecture_{name}_parquet_s']:7.3f}s")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    with psycopg.connect(build_dwh.DATABASE_URL, autocommit=True) as conn:
+        drop(conn.cursor())
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"repeat": args.repeat, "python": platform.python_version(), "cpu_count": os.cpu_count(),
+                   "results": results}, f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_fait_annee.py
+# Compare le chargement matières + fait_annee de build_dwh : jointures multi-colonnes
+# IS NOT DISTINCT FROM sur le texte (avant) et jointures sur nk_hash bigint (après).
+# Tourne dans des schémas jetables bench_ods / bench_dwh (ods / dwh ne sont pas touchés).
+# Usage : python benchmarks/bench_fait_annee.py [--sizes 10000 100000 1000000] [--repeat 3] [--timeout 600]
+import os, sys, json, time, argparse, platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import psycopg
+import build_dwh
+from scratch_dwh import scratch, make_source, build_dimensions, create_partitions, drop
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_fait_annee.json")
+
+# version précédente : dimension_etudiant rapprochée deux fois sur (nom, prenom, date_naissance),
+# projet / stage sur toutes leurs colonnes texte
+LEGACY_SQL = r"""
+DROP TABLE IF EXISTS _map_matiere;
+CREATE TEMP TABLE _map_matiere ON COMMIT PRESERVE ROWS AS
+WITH b AS (
+  SELECT de.id_etudiant, o.annee, TRIM(x) AS mat
+  FROM ods.etudiants_clean o
+  JOIN dwh.dimension_etudiant de
+    ON de.nom=o.nom AND de.prenom=o.prenom
+   AND (de.date_naissance IS NOT DISTINCT FROM o.date_naissance)
+  CROSS JOIN LATERAL regexp_split_to_table(COALESCE(o.matiere,''), '\s*;\s*') x
+  WHERE o.annee IS NOT NULL AND COALESCE(x,'') <> ''
+),
+agg AS (
+  SELECT id_etudiant, annee, array_to_string(array_agg(DISTINCT mat ORDER BY mat), '; ') AS matieres_text
+  FROM b GROUP BY id_etudiant, annee
+)
+SELECT id_etudiant, annee,
+       (SELECT COALESCE(MAX(id_matiere), 0) FROM dwh.dimension_matiere)
+         + ROW_NUMBER() OVER (ORDER BY id_etudiant, annee) AS id_matiere,
+       matieres_text
+FROM agg;
+
+INSERT INTO dwh.dimension_matiere (id_matiere, nom_matiere) OVERRIDING SYSTEM VALUE
+SELECT id_matiere, NULLIF(matieres_text, '') FROM _map_matiere ORDER BY id_matiere;
+
+INSERT INTO dwh.fait_annee (annee, id_ecole, id_stage, id_etudiant, id_projet, id_matiere)
+SELECT o.annee, ec.id_ecole, st.id_stage, et.id_etudiant, pr.id_projet, mp.id_matiere
+FROM ods.etudiants_clean o
+LEFT JOIN dwh.dimension_etudiant et
+  ON et.nom=o.nom AND et.prenom=o.prenom
+ AND (et.date_naissance IS NOT DISTINCT FROM o.date_naissance)
+LEFT JOIN dwh.dimension_ecole ec
+  ON ec.nom_ecole = NULLIF(o.ecole,'')
+LEFT JOIN dwh.dimension_projet pr
+  ON pr.nom_projet  IS NOT DISTINCT FROM NULLIF(o.projet,'')
+ AND pr.description IS NOT DISTINCT FROM NULLIF(o.description_projet,'')
+ AND pr.publier     IS NOT DISTINCT FROM o.publie
+LEFT JOIN dwh.dimension_info_stage st
+  ON st.entreprise  IS NOT DISTINCT FROM NULLIF(o.stage_entreprise,'')
+ AND st.pays        IS NOT DISTINCT FROM NULLIF(o.stage_pays,'')
+ AND st.date_debut  IS NOT DISTINCT FROM o.stage_debut
+ AND st.date_fin    IS NOT DISTINCT FROM o.stage_fin
+JOIN _map_matiere mp
+  ON mp.id_etudiant = et.id_etudiant
+ AND mp.annee       = o.annee
+WHERE o.annee IS NOT NULL
+GROUP BY o.annee, ec.id_ecole, st.id_stage, et.id_etudiant, pr.id_projet, mp.id_matiere;
+"""
+
+def run_legacy(cur):
+    cur.execute(scratch(LEGACY_SQL))
+
+def run_hashed(cur):
+    cur.execute(scratch(build_dwh.ODS_FAIT_SQL))
+    cur.execute(scratch(build_dwh.MATIERE_SQL))
+    cur.execute(scratch(build_dwh.FAIT_SQL))
+
+def snapshot(cur):
+    cur.execute("""SELECT COUNT(*), md5(string_agg(concat_ws('|', annee, id_ecole, id_stage, id_etudiant, id_projet, id_matiere),
+                                               ',' ORDER BY annee, id_etudiant, id_matiere, id_ecole, id_stage, id_projet))
+                   FROM bench_dwh.fait_annee""")
+    return cur.fetchone()
+
+def timed(cur, fn, repeat, timeout):
+    times = []
+    cur.execute(f"SET statement_timeout = '{int(timeout)}s'")
+    try:
+        for _ in range(repeat):
+            cur.execute("TRUNCATE bench_dwh.fait_annee, bench_dwh.dimension_matiere RESTART IDENTITY;")
+            t0 = time.perf_counter()
+            fn(cur)
+            times.append(time.perf_counter() - t0)
+    except psycopg.errors.QueryCanceled:
+        return None, None
+    finally:
+        cur.execute("RESET statement_timeout")
+    return min(times), snapshot(cur)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--timeout", type=float, default=600, help="secondes max par requête")
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    results = []
+    with psycopg.connect(build_dwh.DATABASE_URL, autocommit=True) as conn:
+        cur = conn.cursor()
+        for n in args.sizes:
+            make_source(cur, n)
+            build_dimensions(cur)
+            create_partitions(cur, build_dwh.ods_years(cur, "bench_ods.etudiants_clean"))
+            before, ref = timed(cur, run_legacy, args.repeat, args.timeout)
+            after, new = timed(cur, run_hashed, args.repeat, args.timeout)
+            same = None if ref is None else ref == new
+            results.append({"eleves_annees": n, "lignes_fait": new[0],
+                            "avant_s": None if before is None else round(before, 3), "apres_s": round(after, 3),
+                            "speedup": None if before is None else round(before / after, 1),
+                            "resultat_identique": same})
+            avant = f"{before:7.2f}s" if before is not None else f">{args.timeout:.0f}s (interrompu)"
+            print(f"   {n:>9,} élèves-années  avant {avant}  après {after:7.2f}s  identique={same}")
+        drop(cur)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"repeat": args.repeat, "timeout_s": args.timeout, "python": platform.python_version(),
+                   "cpu_count": os.cpu_count(), "results": results}, f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+
+if __name__ == "__main__":
+    main()
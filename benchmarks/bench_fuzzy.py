@@ -0,0 +1,92 @@
+# benchmarks/bench_fuzzy.py
+# Dédup approchée (fuzzy_dedup) sur des sources synthétiques (generate_source) où une part
+# --noise des lignes reçoit une faute de frappe dans le nom ou un nom / prénom inversé.
+# L'identité d'origine de chaque ligne est connue : par seuil, on mesure les élèves
+# retrouvés (toutes leurs lignes ramenées à une seule orthographe), les fusions à tort
+# (deux élèves différents réunis), les paires candidates, la réduction due au blocage et
+# les paires comparées par seconde.
+# Usage : python benchmarks/bench_fuzzy.py [--sizes 10000 100000 1000000] [--thresholds 0.7 0.8 0.9]
+import os, sys, json, time, argparse, platform
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import etl_bi_clean as etl
+import fuzzy_dedup
+from generate_source import iter_blocks, SEED
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_fuzzy.json")
+NOISE = 0.02       # part des lignes altérées
+LETTERS = np.array(list("abcdefghijklmnopqrstuvwxyz"), dtype=object)
+
+def person_ids(df):
+    """Identifiant de l'élève au sens de la dédup exacte (nom, prénom, date normalisés)."""
+    nom, prenom, naiss = etl.person_year_key_parts(df)[:3]
+    return pd.factorize(pd.MultiIndex.from_arrays([nom, prenom, naiss]))[0]
+
+def corrupt(df, noise, rng):
+    """Altère une part `noise` des lignes : faute de frappe dans le nom (1 lettre remplacée)
+    ou nom / prénom inversés, moitié-moitié ; retourne le nombre de lignes touchées."""
+    hit = np.flatnonzero((rng.random(len(df)) < noise) & df["nom"].notna().to_numpy()
+                         & df["prenom"].notna().to_numpy())
+    swap = rng.random(len(hit)) < 0.5
+    noms, prenoms = df["nom"].to_numpy(dtype=object, copy=True), df["prenom"].to_numpy(dtype=object, copy=True)
+    rows = hit[swap]
+    noms[rows], prenoms[rows] = prenoms[rows], noms[rows].copy()
+    for i, letter in zip(hit[~swap], rng.choice(LETTERS, (~swap).sum())):
+        name = noms[i]
+        pos = 1 + rng.integers(0, max(len(name) - 1, 1))
+        noms[i] = name[:pos] + letter + name[pos + 1:]
+    df["nom"], df["prenom"] = noms, prenoms
+    return len(hit)
+
+def evaluate(truth, after):
+    """Élèves (vrais) ramenés à une seule orthographe, et groupes mêlant plusieurs vrais élèves."""
+    pairs = pd.DataFrame({"truth": truth, "after": after}).drop_duplicates()
+    split = pairs.groupby("truth").size()
+    merged = pairs.groupby("after").size()
+    return {"eleves_vrais": len(split), "eleves_eclates": int((split > 1).sum()),
+            "fusions_a_tort": int((merged > 1).sum())}
+
+def run_size(n, args, rng):
+    raw = pd.concat(iter_blocks(n, args.seed), ignore_index=True).rename(columns=etl.rename_map)
+    clean = etl.clean_rows(raw, engine=args.engine)
+    truth = person_ids(clean)
+    altered = corrupt(clean, args.noise, rng)
+    before = evaluate(truth, person_ids(clean))
+    print(f"   {n:>11,} lignes, {before['eleves_vrais']:,} élèves, {altered:,} ligne(s) altérée(s), "
+          f"{before['eleves_eclates']:,} élève(s) éclaté(s) par la dédup exacte")
+    runs = []
+    for threshold in args.thresholds:
+        df = clean[["nom", "prenom", "date_naissance", "annee"]].copy()
+        t0 = time.perf_counter()
+        df, stats = fuzzy_dedup.fuzzy_dedup(df, threshold)
+        wall = time.perf_counter() - t0
+        quality = evaluate(truth, person_ids(df))
+        runs.append({**stats, **quality, "wall_s": round(wall, 3)})
+        print(f"      seuil {threshold:<5} {wall:7.2f}s  {stats['paires_candidates']:>11,} paires "
+              f"({stats['reduction']:.4%} évitées)  {stats['paires_par_s'] or 0:>12,} paires/s  "
+              f"éclatés {quality['eleves_eclates']:>7,}  fusions à tort {quality['fusions_a_tort']:>6,}")
+    return {"rows": n, "altered_rows": altered, "exact": before, "runs": runs}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--thresholds", type=float, nargs="+", default=[0.7, fuzzy_dedup.THRESHOLD, 0.9])
+    ap.add_argument("--noise", type=float, default=NOISE, help="part des lignes altérées")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--engine", choices=sorted(etl.CLEANERS), default=etl.ENGINE)
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = [run_size(n, args, rng) for n in args.sizes]
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+                   "platform": platform.platform(), "seed": args.seed, "noise": args.noise,
+                   "max_block": fuzzy_dedup.MAX_BLOCK, "results": results}, f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+
+if __name__ == "__main__":
+    main()
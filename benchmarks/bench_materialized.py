@@ -0,0 +1,82 @@
+# benchmarks/bench_materialized.py
+# Compare la couche matérialisée de build_dwh (dwh.flat, dwh.synthese_*) et les requêtes
+# qu'elle remplace : export CSV de la vue aplatie (jointure à 5 dimensions contre lecture de
+# dwh.flat), requêtes des tableaux de bord (jointure + agrégat contre lecture de la synthèse),
+# puis coût du rafraîchissement (REFRESH simple et CONCURRENTLY).
+# Tourne dans des schémas jetables bench_ods / bench_dwh (ods / dwh ne sont pas touchés).
+# Usage : python benchmarks/bench_materialized.py [--sizes 100000 1000000] [--repeat 3]
+import os, sys, json, time, shutil, argparse, platform, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import psycopg
+import build_dwh
+import export_dwh_to_csv as exp
+from scratch_dwh import scratch, make_source, build_dimensions, build_facts, build_materialized, drop
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_materialized.json")
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return round(min(times), 4), out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    results = []
+    tmp = tempfile.mkdtemp(prefix="bench_materialized_")
+    try:
+        with psycopg.connect(build_dwh.DATABASE_URL, autocommit=True) as conn:
+            cur = conn.cursor()
+            for n in args.sizes:
+                make_source(cur, n)
+                build_dimensions(cur)
+                build_facts(cur, build_dwh.ods_years(cur, "bench_ods.etudiants_clean"))
+                build_materialized(cur)
+                res = {"eleves_annees": n}
+                print(f"   {n:>9,} élèves-années")
+
+                joined = exp.FLAT_SQL.replace("dwh.flat", f"({build_dwh.FLAT_SQL}) j")   # mêmes colonnes, même ordre
+                for label, query in (("jointure", joined), ("materialisee", exp.FLAT_SQL)):
+                    path = os.path.join(tmp, f"flat_{label}.csv")
+                    res[f"export_flat_{label}_s"], _ = best(lambda: exp.export_query(conn, scratch(query), path), args.repeat)
+                with open(os.path.join(tmp, "flat_jointure.csv"), "rb") as a, \
+                     open(os.path.join(tmp, "flat_materialisee.csv"), "rb") as b:
+                    res["export_flat_identique"] = a.read() == b.read()
+                print(f"      {'export dwh_flat':<28} jointure {res['export_flat_jointure_s']:7.3f}s"
+                      f"  matérialisée {res['export_flat_materialisee_s']:7.3f}s  identique={res['export_flat_identique']}")
+
+                for name, select, key, _ in build_dwh.MATERIALIZED[1:]:
+                    order = f" ORDER BY {key}"
+                    direct, ref = best(lambda: cur.execute(scratch(select) + order).fetchall(), args.repeat)
+                    mat, new = best(lambda: cur.execute(f"SELECT * FROM bench_dwh.{name}{order}").fetchall(), args.repeat)
+                    res[f"{name}_jointure_s"], res[f"{name}_materialisee_s"] = direct, mat
+                    res[f"{name}_identique"] = ref == new
+                    print(f"      {name:<28} jointure {direct:7.4f}s  matérialisée {mat:7.4f}s  identique={ref == new}")
+
+                for name, *_ in build_dwh.MATERIALIZED:
+                    for label, sql in (("simple", f"REFRESH MATERIALIZED VIEW bench_dwh.{name}"),
+                                       ("concurrent", f"REFRESH MATERIALIZED VIEW CONCURRENTLY bench_dwh.{name}")):
+                        res[f"refresh_{name}_{label}_s"], _ = best(lambda: cur.execute(sql), 1)
+                    print(f"      refresh {name:<20} simple {res[f'refresh_{name}_simple_s']:7.3f}s"
+                          f"  concurrent {res[f'refresh_{name}_concurrent_s']:7.3f}s")
+                results.append(res)
+            drop(cur)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"repeat": args.repeat, "python": platform.python_version(), "cpu_count": os.cpu_count(),
+                   "results": results}, f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+
+if __name__ == "__main__":
+    main()
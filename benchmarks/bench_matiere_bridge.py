@@ -0,0 +1,114 @@
+# benchmarks/bench_matiere_bridge.py
+# Compare les requêtes filtrées par matière sur la liste agrégée (dimension_matiere, 1 ligne par
+# élève-année, nom_matiere = "A; B; C" à redécouper) et sur le modèle normalisé
+# (dimension_matiere_norm + bridge_fait_matiere) ; vérifie aussi que v_fait_matieres redonne
+# exactement les listes de dimension_matiere.
+# Tourne dans des schémas jetables bench_ods / bench_dwh (ods / dwh ne sont pas touchés).
+# Usage : python benchmarks/bench_matiere_bridge.py [--sizes 100000 1000000] [--repeat 3]
+import os, sys, json, time, argparse, platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import psycopg
+import build_dwh
+from scratch_dwh import make_source, build_dimensions, build_facts, drop
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_matiere_bridge.json")
+
+# (liste agrégée, modèle normalisé) ; {y} = année filtrée, {m} / {m2} = matières
+QUERIES = {
+    "eleves_matiere_annee": (
+        """SELECT COUNT(DISTINCT f.id_etudiant) FROM bench_dwh.fait_annee f
+           JOIN bench_dwh.dimension_matiere dm USING (id_matiere)
+           WHERE f.annee = {y} AND dm.nom_matiere LIKE '%{m}%'
+             AND '{m}' = ANY(string_to_array(dm.nom_matiere, '; '))""",
+        """SELECT COUNT(DISTINCT f.id_etudiant) FROM bench_dwh.bridge_fait_matiere b
+           JOIN bench_dwh.dimension_matiere_norm m USING (id_matiere)
+           JOIN bench_dwh.fait_annee f USING (id_template, annee)
+           WHERE b.annee = {y} AND m.nom_matiere = '{m}'"""),
+    "deux_matieres_annee": (
+        """SELECT COUNT(*) FROM bench_dwh.fait_annee f
+           JOIN bench_dwh.dimension_matiere dm USING (id_matiere)
+           WHERE f.annee = {y} AND string_to_array(dm.nom_matiere, '; ') @> ARRAY['{m}', '{m2}']""",
+        """SELECT COUNT(*) FROM (
+             SELECT b.id_template FROM bench_dwh.bridge_fait_matiere b
+             JOIN bench_dwh.dimension_matiere_norm m USING (id_matiere)
+             WHERE b.annee = {y} AND m.nom_matiere IN ('{m}', '{m2}')
+             GROUP BY b.id_template HAVING COUNT(*) = 2) t"""),
+    "effectifs_par_matiere": (
+        """SELECT s.mat, f.annee, COUNT(*) FROM bench_dwh.fait_annee f
+           JOIN bench_dwh.dimension_matiere dm USING (id_matiere)
+           CROSS JOIN LATERAL unnest(string_to_array(dm.nom_matiere, '; ')) s(mat)
+           GROUP BY s.mat, f.annee ORDER BY 1, 2""",
+        """SELECT m.nom_matiere, b.annee, COUNT(*) FROM bench_dwh.bridge_fait_matiere b
+           JOIN bench_dwh.dimension_matiere_norm m USING (id_matiere)
+           GROUP BY m.nom_matiere, b.annee ORDER BY 1, 2"""),
+}
+
+# matières filtrées : la paire la plus fréquente de l'année (les matières synthétiques dépendent de l'année)
+PAIR_SQL = """
+SELECT string_to_array(dm.nom_matiere, '; ')
+FROM bench_dwh.fait_annee f
+JOIN bench_dwh.dimension_matiere dm USING (id_matiere)
+WHERE f.annee = %s AND dm.nom_matiere LIKE '%%;%%'
+GROUP BY dm.nom_matiere ORDER BY COUNT(*) DESC, dm.nom_matiere LIMIT 1
+"""
+
+COMPAT_SQL = """
+SELECT COUNT(*) FILTER (WHERE dm.nom_matiere IS DISTINCT FROM v.nom_matiere)
+FROM bench_dwh.fait_annee f
+JOIN bench_dwh.dimension_matiere dm USING (id_matiere)
+LEFT JOIN bench_dwh.v_fait_matieres v USING (id_template, annee)
+"""
+
+def best(cur, query, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cur.execute(query)
+        rows = cur.fetchall()
+        times.append(time.perf_counter() - t0)
+    return round(min(times), 4), rows
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    results = []
+    with psycopg.connect(build_dwh.DATABASE_URL, autocommit=True) as conn:
+        cur = conn.cursor()
+        for n in args.sizes:
+            make_source(cur, n)
+            build_dimensions(cur)
+            years = build_dwh.ods_years(cur, "bench_ods.etudiants_clean")
+            build_facts(cur, years)
+            annee = years[-1]
+            cur.execute("SELECT COUNT(*) FROM bench_dwh.bridge_fait_matiere")
+            res = {"eleves_annees": n, "lignes_pont": cur.fetchone()[0], "annee_filtree": annee}
+            cur.execute(PAIR_SQL, (annee,))
+            matiere, autre = cur.fetchone()[0][:2]
+            res["matieres_filtrees"] = [matiere, autre]
+            cur.execute(COMPAT_SQL)
+            res["vue_compatible"] = cur.fetchone()[0] == 0
+            print(f"   {n:>9,} élèves-années, {res['lignes_pont']:,} lignes de pont, vue compatible={res['vue_compatible']}"
+                  f" (filtre {matiere} / {autre}, {annee})")
+            for name, (liste, pont) in QUERIES.items():
+                fmt = dict(y=annee, m=matiere, m2=autre)
+                res[f"{name}_liste_s"], ref = best(cur, liste.format(**fmt), args.repeat)
+                res[f"{name}_pont_s"], new = best(cur, pont.format(**fmt), args.repeat)
+                res[f"{name}_identique"] = ref == new
+                print(f"      {name:<22} liste {res[f'{name}_liste_s']:7.4f}s  pont {res[f'{name}_pont_s']:7.4f}s"
+                      f"  identique={ref == new}")
+            results.append(res)
+        drop(cur)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"repeat": args.repeat, "python": platform.python_version(), "cpu_count": os.cpu_count(),
+                   "results": results}, f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+
+if __name__ == "__main__":
+    main()
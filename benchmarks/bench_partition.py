@@ -0,0 +1,109 @@
+# benchmarks/bench_partition.py
+# Compare dwh.fait_annee partitionnée par annee (build_dwh) et la même table en tas unique
+# (index sur annee) : requêtes filtrées sur l'année (durée, partitions parcourues, blocs lus
+# via EXPLAIN (ANALYZE, BUFFERS)) puis rechargement d'une année (DELETE + INSERT dans le tas
+# contre chargement d'une table autonome + DETACH / ATTACH).
+# Tourne dans des schémas jetables bench_ods / bench_dwh (ods / dwh ne sont pas touchés).
+# Usage : python benchmarks/bench_partition.py [--sizes 100000 1000000] [--years 10] [--repeat 3]
+import os, sys, json, time, argparse, platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import psycopg
+import build_dwh
+from scratch_dwh import scratch, make_source, build_dimensions, build_facts, drop
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_partition.json")
+HEAP = "bench_dwh.fait_heap"
+
+# {t} = table de faits, {y} = année filtrée
+QUERIES = {
+    "comptage_annee": "SELECT COUNT(*), COUNT(DISTINCT id_etudiant) FROM {t} WHERE annee = {y}",
+    "par_ecole_annee": """SELECT ec.nom_ecole, COUNT(*) FROM {t} f
+                          JOIN bench_dwh.dimension_ecole ec USING (id_ecole)
+                          WHERE f.annee = {y} GROUP BY ec.nom_ecole""",
+    "deux_dernieres_annees": "SELECT annee, COUNT(*) FROM {t} WHERE annee BETWEEN {y} - 1 AND {y} GROUP BY annee",
+}
+
+def build_heap(cur):
+    cur.execute(f"""
+        CREATE TABLE {HEAP} AS SELECT * FROM bench_dwh.fait_annee ORDER BY id_etudiant, annee;  -- années entremêlées
+        CREATE INDEX ON {HEAP} (annee);
+        CREATE INDEX ON {HEAP} (id_etudiant);
+        ANALYZE {HEAP};
+    """)
+
+def plan_stats(cur, query):
+    """(tables de faits parcourues, blocs lus en cache + disque) d'après EXPLAIN (ANALYZE, BUFFERS)."""
+    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+    plan = cur.fetchone()[0][0]["Plan"]
+    scanned, nodes = set(), [plan]
+    while nodes:
+        node = nodes.pop()
+        if node.get("Relation Name", "").startswith("fait_"):
+            scanned.add(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return len(scanned), plan["Shared Hit Blocks"] + plan["Shared Read Blocks"]
+
+def best(cur, query, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cur.execute(query)
+        cur.fetchall()
+        times.append(time.perf_counter() - t0)
+    return round(min(times), 4)
+
+def reload_heap(cur, annee):
+    cur.execute(f"DELETE FROM {HEAP} WHERE annee = {int(annee)};" + scratch(build_dwh.fait_sql("dwh.fait_heap", annee)))
+
+def reload_partition(cur, annee):
+    table = f"dwh.{build_dwh.partition_name(annee)}_new"
+    cur.execute(scratch(build_dwh.load_year_sql(annee, table) + build_dwh.swap_year_sql(annee, table)))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--years", type=int, default=10, help="nombre d'années distinctes dans la source")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    results = []
+    with psycopg.connect(build_dwh.DATABASE_URL, autocommit=True) as conn:
+        cur = conn.cursor()
+        for n in args.sizes:
+            make_source(cur, n, years=args.years)
+            build_dimensions(cur)
+            years = build_dwh.ods_years(cur, "bench_ods.etudiants_clean")
+            build_facts(cur, years)
+            build_heap(cur)
+            annee = years[-1]
+            res = {"eleves_annees": n, "annees": len(years), "annee_filtree": annee}
+            print(f"   {n:>9,} élèves-années sur {len(years)} années (filtre annee = {annee})")
+            for name, sql in QUERIES.items():
+                for label, table in (("tas", HEAP), ("partitionnee", "bench_dwh.fait_annee")):
+                    query = sql.format(t=table, y=annee)
+                    scanned, blocks = plan_stats(cur, query)
+                    res[f"{name}_{label}_s"] = best(cur, query, args.repeat)
+                    res[f"{name}_{label}_tables"] = scanned
+                    res[f"{name}_{label}_blocs"] = blocks
+                print(f"      {name:<22} tas {res[f'{name}_tas_s']:7.4f}s ({res[f'{name}_tas_blocs']:>7} blocs)"
+                      f"  partitionnée {res[f'{name}_partitionnee_s']:7.4f}s ({res[f'{name}_partitionnee_blocs']:>7} blocs,"
+                      f" {res[f'{name}_partitionnee_tables']} partition(s))")
+            for label, reload in (("tas", reload_heap), ("partitionnee", reload_partition)):
+                t0 = time.perf_counter()
+                reload(cur, annee)
+                res[f"rechargement_annee_{label}_s"] = round(time.perf_counter() - t0, 3)
+            print(f"      {'rechargement_annee':<22} tas {res['rechargement_annee_tas_s']:7.3f}s"
+                  f"  partitionnée {res['rechargement_annee_partitionnee_s']:7.3f}s")
+            results.append(res)
+        drop(cur)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"repeat": args.repeat, "python": platform.python_version(), "cpu_count": os.cpu_count(),
+                   "results": results}, f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+
+if __name__ == "__main__":
+    main()
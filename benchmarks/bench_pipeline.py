@@ -0,0 +1,185 @@
+# benchmarks/bench_pipeline.py
+# Chaîne complète (lecture, nettoyage, agrégation, ODS, DWH, rechargement sans changement,
+# export) sur des sources synthétiques (generate_source) de tailles croissantes, dans un
+# PostgreSQL jetable : pgserver s'il est installé, sinon initdb / pg_ctl (PATH ou --pg-bin).
+# --dsn : base existante à la place (ses schémas ods / dwh sont ÉCRASÉS).
+# Résultats JSON : durée, lignes, lignes/s et pic RSS par étape. --compare ancien.json compare
+# étape par étape (même taille) et sort en erreur si une étape est plus lente de plus de
+# --tolerance (régression).
+# 10 M lignes : --stream (nettoyage à mémoire bornée, etl_bi_clean --stream) conseillé.
+# Usage : python benchmarks/bench_pipeline.py [--sizes 10000 100000 1000000] [--stream]
+#                                             [--data-dir benchmarks/data] [--compare ancien.json]
+import os, sys, json, time, shutil, argparse, platform, tempfile, subprocess, contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import profiling
+import etl_bi_clean as etl
+import etl_to_ods, build_dwh, export_dwh_to_csv
+from db import open_pool
+from dq_profile import DQProfile
+from generate_source import generate, SEED
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_pipeline.json")
+TOLERANCE = 0.25   # --compare : +25 % de durée sur une étape = régression
+
+@contextlib.contextmanager
+def throwaway_postgres(pg_bin=None):
+    """Cluster PostgreSQL temporaire (supprimé en sortie) ; produit son URL de connexion."""
+    tmp = tempfile.mkdtemp(prefix="bench_pg_")
+    try:
+        try:
+            import pgserver
+        except ImportError:
+            pgserver = None
+        if pgserver is not None and pg_bin is None:
+            server = pgserver.get_server(os.path.join(tmp, "data"), cleanup_mode="delete")
+            try:
+                yield server.get_uri()
+            finally:
+                server.cleanup()
+            return
+        initdb, pg_ctl = shutil.which("initdb", path=pg_bin), shutil.which("pg_ctl", path=pg_bin)
+        if not (initdb and pg_ctl):
+            raise SystemExit("❌ Pas de PostgreSQL jetable : installer pgserver, mettre initdb / pg_ctl dans "
+                             "le PATH (ou --pg-bin), ou passer --dsn")
+        data = os.path.join(tmp, "data")
+        subprocess.run([initdb, "-D", data, "-U", "bench", "--auth=trust", "-E", "UTF8"], check=True,
+                       capture_output=True)
+        subprocess.run([pg_ctl, "-D", data, "-l", os.path.join(tmp, "postgres.log"), "-w",
+                        "-o", f"-k {tmp} -c listen_addresses=''", "start"], check=True, capture_output=True)
+        try:
+            yield f"postgresql://bench@/postgres?host={tmp}"
+        finally:
+            subprocess.run([pg_ctl, "-D", data, "-m", "fast", "-w", "stop"], capture_output=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def timed(stages, name, fn, rows=len):
+    """Exécute fn() et note durée, lignes (rows(résultat)), lignes/s et pic RSS de l'étape."""
+    reset_ok = profiling.reset_peak_rss()
+    t0 = time.perf_counter()
+    out = fn()
+    wall = time.perf_counter() - t0
+    n = rows(out)
+    stages[name] = {"wall_s": round(wall, 3), "rows": n, "rows_per_s": round(n / wall) if wall else None,
+                    "peak_rss_mb": profiling.peak_rss_mb(reset_ok)}
+    print(f"      {name:<16} {wall:8.2f}s {n:>11,} lignes {stages[name]['peak_rss_mb']:>8.0f} Mo")
+    return out
+
+def _observed(dq, agg):
+    dq.observe(agg)
+    return agg
+
+def _report_rows(outputs):
+    with open(outputs[-1], encoding="utf-8") as f:   # data_quality_report.json
+        return json.load(f)["nb_lignes_sortie"]
+
+def run_chain(src, tmp, pool, args):
+    """Une exécution de la chaîne sur `src` ; retourne {étape: mesures}."""
+    stages = {}
+    if args.stream:
+        outputs = timed(stages, "clean_stream", lambda: etl.stream_clean(
+            src, os.path.join(tmp, "clean"), args.engine, cache_dir=None, formats=["csv"]), rows=_report_rows)
+        clean = outputs[0]
+    else:
+        raw = timed(stages, "read", lambda: etl.read_source(src, None))
+        dq = DQProfile()   # profil qualité compris, comme etl_bi_clean
+        df = timed(stages, "clean", lambda: etl.clean_rows(raw, engine=args.engine, dq=dq))
+        agg = timed(stages, "aggregate", lambda: _observed(dq, etl.aggregate_person_year(df, engine=args.engine)))
+        clean = timed(stages, "finalize", lambda: etl.finalize(agg))
+        del raw, df, agg
+    loaded, facts = (lambda c: c["rows_in_file"]), (lambda c: c["fait_annee"])
+    with pool.connection() as conn:
+        timed(stages, "ods", lambda: etl_to_ods.load(conn, clean, args.loader), rows=loaded)
+    timed(stages, "dwh", lambda: build_dwh.build(jobs=args.jobs, pool=pool), rows=facts)
+    # relance nocturne sans changement : delta ODS vide puis rafraîchissement incrémental
+    with pool.connection() as conn:
+        timed(stages, "ods_incremental", lambda: etl_to_ods.load(conn, clean, args.loader, incremental=True),
+              rows=loaded)
+    timed(stages, "dwh_incremental", lambda: build_dwh.build(incremental=True, jobs=args.jobs, pool=pool), rows=facts)
+    timed(stages, "export", lambda: export_dwh_to_csv.export(os.path.join(tmp, "exports"), jobs=args.jobs, pool=pool),
+          rows=lambda datasets: sum(d["rows"] for d in datasets.values()))
+    return stages
+
+def best_of(runs):
+    """Par étape, les mesures de l'exécution la plus rapide."""
+    return {name: min((r[name] for r in runs), key=lambda s: s["wall_s"]) for name in runs[0]}
+
+def compare(results, path, tolerance):
+    """Affiche le rapport durée actuelle / référence ; retourne le nombre de régressions."""
+    with open(path, encoding="utf-8") as f:
+        previous = {r["rows"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\n📈 Comparaison avec {path} (tolérance +{tolerance:.0%}) :")
+    for res in results:
+        old = previous.get(res["rows"])
+        if old is None:
+            print(f"   {res['rows']:>11,} lignes : absent de la référence")
+            continue
+        for name, s in res["stages"].items():
+            ref = old["stages"].get(name)
+            if not ref or not ref["wall_s"]:
+                continue
+            ratio = s["wall_s"] / ref["wall_s"]
+            slower = ratio > 1 + tolerance
+            regressions += slower
+            print(f"   {res['rows']:>11,} {name:<16} {ref['wall_s']:8.2f}s → {s['wall_s']:8.2f}s  x{ratio:5.2f}"
+                  f"{'  ⚠️  régression' if slower else ''}")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=1, help="exécutions par taille (meilleure durée par étape)")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--stream", action="store_true", help="nettoyage à mémoire bornée (etl_bi_clean --stream)")
+    ap.add_argument("--engine", choices=sorted(etl.CLEANERS), default=etl.ENGINE)
+    ap.add_argument("--loader", choices=sorted(etl_to_ods.LOADERS), default=etl_to_ods.LOADER)
+    ap.add_argument("--jobs", type=int, default=build_dwh.JOBS)
+    ap.add_argument("--data-dir", help="garde les sources générées ici et les réutilise (défaut : temporaires)")
+    ap.add_argument("--dsn", help="base existante au lieu d'un PostgreSQL jetable (schémas ods / dwh écrasés)")
+    ap.add_argument("--pg-bin", help="dossier de initdb / pg_ctl (au lieu de pgserver)")
+    ap.add_argument("--compare", metavar="JSON", help="résultats de référence (régression = code de sortie 1)")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE)
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_pipeline_")
+    data_dir = args.data_dir or tmp
+    results = []
+    try:
+        with contextlib.nullcontext(args.dsn) if args.dsn else throwaway_postgres(args.pg_bin) as dsn:
+            # toutes les étapes passent par ce pool : DATABASE_URL n'est pas utilisé
+            with open_pool(args.jobs + 1, dsn) as pool:
+                with pool.connection() as conn:
+                    server_version = conn.execute("SHOW server_version").fetchone()[0]
+                print(f"PostgreSQL {server_version} — {os.cpu_count()} cœur(s)")
+                for n in args.sizes:
+                    src = os.path.join(data_dir, f"source_{n}_{args.seed}.csv")
+                    generate_s = None
+                    if not os.path.exists(src):
+                        t0 = time.perf_counter()
+                        generate(n, src, args.seed)
+                        generate_s = round(time.perf_counter() - t0, 3)
+                    print(f"   {n:>11,} lignes source ({os.path.getsize(src) / 2**20:.1f} Mo)")
+                    runs = [run_chain(src, tmp, pool, args) for _ in range(args.repeat)]
+                    stages = best_of(runs)
+                    results.append({"rows": n, "source_mb": round(os.path.getsize(src) / 2**20, 1),
+                                    "generate_s": generate_s, "stages": stages,
+                                    "total_s": round(sum(s["wall_s"] for s in stages.values()), 3)})
+                    print(f"      {'total':<16} {results[-1]['total_s']:8.2f}s")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+                   "platform": platform.platform(), "cpu_count": os.cpu_count(), "postgres": server_version,
+                   "seed": args.seed, "repeat": args.repeat, "stream": args.stream, "engine": args.engine,
+                   "loader": args.loader, "jobs": args.jobs, "results": results}, f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_workers.py
+# Mesure l'accélération de etl_bi_clean --workers N (nettoyage + agrégation Personne × Année).
+# Usage : python benchmarks/bench_workers.py [source] [--workers 1 2 4 8] [--repeat 3]
+import os, sys, json, time, argparse, platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import etl_bi_clean as etl
+
+OUT_JSON = os.path.join("benchmarks", "results", "bench_workers.json")
+
+def run_once(raw, workers, engine):
+    t0 = time.perf_counter()
+    if workers == 1:
+        clean = etl.finalize(etl.aggregate_person_year(etl.clean_rows(raw.copy(), engine=engine), engine=engine))
+    else:
+        clean = etl.parallel_clean(raw, workers, engine=engine)
+    return time.perf_counter() - t0, clean
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("src", nargs="?", default=etl.SRC)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--engine", default=etl.ENGINE)
+    ap.add_argument("--out", default=OUT_JSON)
+    args = ap.parse_args()
+
+    raw = etl.read_source(args.src)
+    print(f"Source : {args.src} ({len(raw)} lignes) — {os.cpu_count()} cœur(s)")
+
+    results, reference, base = [], None, None
+    for n in args.workers:
+        times = []
+        for _ in range(args.repeat):
+            t, clean = run_once(raw, n, args.engine)
+            times.append(t)
+        csv = clean.to_csv(index=False)
+        reference = reference or csv
+        best = min(times)
+        base = base or best
+        results.append({"workers": n, "best_s": round(best, 3), "runs_s": [round(t, 3) for t in times],
+                        "speedup": round(base / best, 2), "identical_output": csv == reference})
+        print(f"   workers={n:<2}  {best:7.2f}s  x{base / best:4.2f}  sortie identique={csv == reference}")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"source": args.src, "rows": len(raw), "cpu_count": os.cpu_count(),
+                   "python": platform.python_version(), "engine": args.engine, "results": results},
+                  f, ensure_ascii=False, indent=2)
+    print("→", args.out)
+
+if __name__ == "__main__":
+    main()
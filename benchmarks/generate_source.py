@@ -0,0 +1,246 @@
+# benchmarks/generate_source.py
+# Source synthétique bruitée, mêmes colonnes (en-têtes d'origine) que source_bruit_1000_final.xlsx
+# et mêmes bruits que ceux traités par etl_bi_clean : dates en formats mélangés, booléens
+# ✓ / oui / 1.0 / faux…, variantes d'accents / de casse / d'espaces dans les noms, plusieurs
+# lignes par élève-année (une par matière), dates de stage inversées.
+# Génération vectorisée (numpy) par blocs d'élèves : 10 M lignes sans tout garder en mémoire ;
+# même graine (et même taille de bloc) = même fichier.
+# Usage : python benchmarks/generate_source.py 1000000 -o benchmarks/data/source_1m.csv [--seed 42]
+import os, sys, gzip, time, argparse, unicodedata
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import etl_bi_clean
+
+HEADERS = list(etl_bi_clean.rename_map)        # en-têtes du classeur d'origine
+SEED = 42
+BLOCK_PERSONS = 20_000                         # ≈ 380 000 lignes par bloc
+FORMATS = {".csv": "csv", ".gz": "csv.gz", ".parquet": "parquet", ".xlsx": "xlsx"}
+
+NOMS = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau",
+        "Simon", "Laurent", "Lefèvre", "Michel", "Garcia", "David", "Bertrand", "Roux", "Vincent", "Fournier",
+        "Morel", "Girard", "André", "Lefebvre", "Mercier", "Dupont", "Lambert", "Bonnet", "François", "Martinez",
+        "Legrand", "Garnier", "Faure", "Rousseau", "Blanc", "Guérin", "Muller", "Henry", "Roussel", "Nicolas",
+        "Perrin", "Morin", "Mathieu", "Clément", "Gauthier", "Dumont", "Lopez", "Fontaine", "Chevalier", "Robin",
+        "Le Roux", "Lévêque", "Diallo", "Perret", "Neveu", "Gaillard", "Thibault", "Hébert", "Bégué", "Régnier",
+        "De La Fontaine", "Du Pont", "Ménard", "Lemaître", "Brûlé", "Péron", "Côté", "Noël", "Aubé", "Jérôme"]
+PRENOMS = ["Richard", "François", "Thierry", "Charles", "Lucy", "Robert", "Guy", "Louise", "Tristan", "Pierre",
+           "Élodie", "Hélène", "Jérôme", "Stéphane", "Frédéric", "Cécile", "Noémie", "Zoé", "Chloé", "Léa",
+           "Amélie", "Anaïs", "Maël", "Inès", "Loïc", "Gaëlle", "Benoît", "Joséphine", "Mathéo", "Léon",
+           "Camille", "Julie", "Nicolas", "Sophie", "Antoine", "Manon", "Hugo", "Emma", "Lucas", "Sarah",
+           "Jean-Baptiste", "Marie-Thérèse", "Anne-Sophie", "Pierre-Yves", "Aurélien", "Valérie", "Océane", "Rémi"]
+PAYS = ["France", "Belgique", "Suisse", "Canada", "Maroc", "Sénégal", "Allemagne", "Irlande", "Ouzbékistan",
+        "Guinée-Bissau", "Corée du Nord", "Gambie", "Libéria", "Ukraine", "Guinée Equatoriale", "Équateur",
+        "Saint-Marin (Rép. de)", "Wallis et Futuna (Îles)", "Tchad", "Montserrat", "Palau", "Groenland",
+        "Bangladesh", "Somalie", "République tchèque", "Bosnie-Herzégovine", "Afrique du sud", "Ghana",
+        "Gabon", "Myanmar", "Lettonie", "Côte d'Ivoire", "Pérou", "Brésil", "Japon", "Viêt Nam"]
+ECOLES = ["Institut Supérieur", "Université Lumière", "École Polytechnique"]
+MATIERES = ["Biologie", "Chimie", "Histoire", "Informatique", "Littérature", "Mathématiques",
+            "Philosophie", "Physique", "Économie"]
+SOCIETES = ["", " SARL", " S.A.", " S.A.S.", " S.A.R.L.", " et Fils", " Marques SARL"]
+VERBES = ["Target", "Revolutionize", "Deliver", "Embrace", "Reinvent", "Evolve", "Re-intermediate", "Optimize",
+          "Streamline", "Leverage", "Scale", "Synergize"]
+ADJECTIFS = ["next-generation", "collaborative", "killer", "visionary", "efficient", "rich", "out-of-the-box",
+             "scalable", "robust", "seamless", "dynamic", "innovative"]
+NOMS_PROJET = ["technologies", "infrastructures", "applications", "synergies", "mindshare", "metrics",
+               "architectures", "convergence", "platforms", "paradigms", "solutions", "channels"]
+MOTS = ["beau", "vie", "effacer", "bête", "tenir", "quel", "sauver", "amour", "cheval", "tourner", "écraser",
+        "armée", "paysan", "espoir", "essayer", "trésor", "pas", "suffire", "fruit", "amener", "éviter", "coup",
+        "signe", "aucun", "vaste", "article", "crainte", "robe", "figurer", "respirer", "art", "moyen",
+        "résultat", "sac", "bientôt", "dimanche", "jouer", "petit", "chaleur", "point", "surveiller", "maintenant"]
+VRAI = ["1.0", "1", "✓", "✔", "oui", "Oui", "OUI", "True", "vrai", "yes", "x", "publié"]
+FAUX = ["0.0", "0", "✗", "non", "Non", "False", "faux", "no", "non publié"]
+
+# Dates : ISO, jj/mm/aaaa, jj-mm-aaaa, aaaa/mm/jj, mm/jj/aaaa (seulement si jour > 12 : pas
+# d'ambiguïté avec jj/mm/aaaa, que parse_date essaie avant)
+DATE_FMTS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%m/%d/%Y"]
+DATE_P = [0.4, 0.25, 0.15, 0.1, 0.1]
+DAY0, NDAYS = np.datetime64("1980-01-01"), 46 * 366
+ANNEES = (2015, 2024)
+P_VARIANTE_NOM = 0.12          # lignes dont nom / prénom sont une variante (accents, casse, espaces)
+P_PROJET, P_EMPLOI, P_STAGE = 0.72, 0.70, 0.68
+P_STAGE_INVERSE = 0.05         # dates de stage début / fin inversées
+P_ESPACES = 0.05               # espaces parasites dans les autres colonnes texte
+
+def _strip_accents(s):
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+
+def _variants(values):
+    """Tableau (5, len(values)) : original, MAJUSCULES, minuscules, sans accents, espaces parasites."""
+    return np.array([[v for v in values], [v.upper() for v in values], [v.lower() for v in values],
+                     [_strip_accents(v) for v in values], ["  " + v.replace(" ", "  ") + " " for v in values]],
+                    dtype=object)
+
+NOM_VARIANTES, PRENOM_VARIANTES = _variants(NOMS), _variants(PRENOMS)
+
+def _date_table():
+    """Chaîne de chaque jour depuis DAY0 dans chacun des DATE_FMTS : (formats, jours)."""
+    days = pd.Series(pd.date_range(str(DAY0), periods=NDAYS, freq="D"))
+    return np.array([days.dt.strftime(f).to_numpy(dtype=object) for f in DATE_FMTS]), days.dt.day.to_numpy()
+
+DATES, JOUR = _date_table()
+
+def _arr(values):
+    return np.array(values, dtype=object)
+
+def _pick(rng, values, n):
+    return _arr(values)[rng.integers(0, len(values), n)]
+
+def _dates(rng, days, present=None):
+    """Jours (depuis DAY0) -> chaînes en formats tirés au hasard ; "" là où present est faux."""
+    fmt = rng.choice(len(DATE_FMTS), size=len(days), p=DATE_P)
+    fmt[(fmt == len(DATE_FMTS) - 1) & (JOUR[days] <= 12)] = 0
+    out = DATES[fmt, days]
+    if present is not None:
+        out[~present] = ""
+    return out
+
+def _noisy(rng, values):
+    """Espaces parasites sur une part P_ESPACES des valeurs (None conservé)."""
+    out = values.copy()
+    hit = (rng.random(len(out)) < P_ESPACES) & np.array([v is not None for v in out])
+    out[hit] = " " + np.char.replace(out[hit].astype(str), " ", "  ").astype(object) + "  "
+    return out
+
+def _days(year, month_lo, month_hi, rng, n):
+    """Jour (depuis DAY0) dans [month_lo, month_hi] de `year` (tableaux numpy)."""
+    start = (year - 1980) * 365.25 + (month_lo - 1) * 30.4
+    return (start + rng.random(n) * (month_hi - month_lo + 1) * 30.4).astype(np.int64)
+
+def generate_block(block, seed=SEED, block_persons=BLOCK_PERSONS):
+    """DataFrame des lignes des élèves [block * block_persons, (block + 1) * block_persons)."""
+    rng = np.random.default_rng([seed, block])
+    p = np.arange(block * block_persons, (block + 1) * block_persons, dtype=np.int64)
+    n_p = len(p)
+    # Élève : identité (nom × prénom × date de naissance uniques jusqu'à ~2,7 M élèves)
+    nom_i = p % len(NOMS)
+    prenom_i = (p // len(NOMS)) % len(PRENOMS)
+    naiss = (p * 7919) % (22 * 365) + 365 * 10                      # 1990 .. 2012
+    nationalite = _pick(rng, PAYS, n_p)
+    ecole = _pick(rng, ECOLES, n_p)
+    emploi = rng.random(n_p) < P_EMPLOI
+    entreprise = _pick(rng, NOMS, n_p) + _pick(rng, SOCIETES, n_p)
+    pays_entreprise = _pick(rng, PAYS, n_p)
+    embauche = rng.integers(15 * 365, 45 * 365, n_p)
+
+    # Élève-années : 4 à 8 années consécutives dans ANNEES
+    n_years = rng.integers(4, 9, n_p)
+    first = rng.integers(ANNEES[0], ANNEES[1] + 1 - 3, n_p)
+    n_years = np.minimum(n_years, ANNEES[1] + 1 - first)
+    py_p = np.repeat(np.arange(n_p), n_years)
+    annee = first[py_p] + (np.arange(len(py_p)) - np.repeat(np.cumsum(n_years) - n_years, n_years))
+    n_py = len(py_p)
+    projet = rng.random(n_py) < P_PROJET
+    titre = _pick(rng, VERBES, n_py) + " " + _pick(rng, ADJECTIFS, n_py) + " " + _pick(rng, NOMS_PROJET, n_py)
+    mots = [_pick(rng, MOTS, n_py) for _ in range(6)]
+    n_mots = rng.integers(3, 7, n_py)
+    description = mots[0].copy()
+    for k in range(1, 6):
+        more = n_mots > k
+        description[more] = description[more] + " " + mots[k][more]
+    description = np.array([d[:1].upper() + d[1:] + "." for d in description], dtype=object)
+    publie = rng.random(n_py) < 0.5
+    stage = rng.random(n_py) < P_STAGE
+    stage_entreprise = _pick(rng, NOMS, n_py) + " " + _pick(rng, NOMS, n_py) + _pick(rng, SOCIETES, n_py)
+    stage_pays = _pick(rng, PAYS, n_py)
+    debut = _days(annee, 1, 7, rng, n_py)
+    fin = debut + rng.integers(30, 150, n_py)
+
+    # Lignes : 1 à 11 par élève-année (une matière chacune, souvent répétée)
+    n_rows = np.minimum(1 + rng.poisson(2.4, n_py), 11)
+    r = np.repeat(np.arange(n_py), n_rows)
+    rp = py_p[r]
+    n = len(r)
+    nom_v = np.where(rng.random(n) < P_VARIANTE_NOM, rng.integers(1, 5, n), 0)
+    prenom_v = np.where(rng.random(n) < P_VARIANTE_NOM, rng.integers(1, 5, n), 0)
+    has_projet, has_emploi, has_stage = projet[r], emploi[rp], stage[r]
+    inverse = has_stage & (rng.random(n) < P_STAGE_INVERSE)
+    d_debut, d_fin = np.where(inverse, fin[r], debut[r]), np.where(inverse, debut[r], fin[r])
+    vrai, faux = _pick(rng, VRAI, n), _pick(rng, FAUX, n)
+
+    none = np.full(n, None, dtype=object)
+    cols = {
+        "Nom": NOM_VARIANTES[nom_v, nom_i[rp]],
+        "Prénom": PRENOM_VARIANTES[prenom_v, prenom_i[rp]],
+        "Date_Naissance": _dates(rng, naiss[rp]),
+        "Nationalité": _noisy(rng, nationalite[rp]),
+        "École": _noisy(rng, ecole[rp]),
+        "Matière": _noisy(rng, _pick(rng, MATIERES, n)),
+        "Année": annee[r],
+        "Projet": np.where(has_projet, titre[r], none),
+        "Description_Projet": np.where(has_projet, description[r], none),
+        "Publié": np.where(has_projet, np.where(publie[r], vrai, faux), none),
+        "Entreprise": _noisy(rng, np.where(has_emploi, entreprise[rp], none)),
+        "Pays_Entreprise": np.where(has_emploi, pays_entreprise[rp], none),
+        "Date_Embauche": _dates(rng, embauche[rp], has_emploi),
+        "Stage_Entreprise": _noisy(rng, np.where(has_stage, stage_entreprise[r], none)),
+        "Stage_Pays": np.where(has_stage, stage_pays[r], none),
+        "Stage_Début": _dates(rng, d_debut, has_stage),
+        "Stage_Fin": _dates(rng, d_fin, has_stage),
+    }
+    return pd.DataFrame(cols, columns=HEADERS)
+
+def iter_blocks(rows, seed=SEED, block_persons=BLOCK_PERSONS):
+    """Blocs successifs jusqu'à exactement `rows` lignes (le dernier élève peut être tronqué)."""
+    block, left = 0, rows
+    while left > 0:
+        df = generate_block(block, seed, block_persons)
+        if len(df) > left:
+            df = df.iloc[:left]
+        left -= len(df)
+        block += 1
+        yield df
+
+def _write_csv(blocks, path, compressed):
+    opener = (lambda: gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=1)) if compressed \
+        else (lambda: open(path, "w", encoding="utf-8", newline=""))
+    with opener() as f:
+        for i, df in enumerate(blocks):
+            df.to_csv(f, index=False, header=i == 0)
+
+def _write_parquet(blocks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([(h, pa.int64() if h == "Année" else pa.string()) for h in HEADERS])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for df in blocks:
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+
+def _write_xlsx(blocks, path):
+    df = pd.concat(blocks, ignore_index=True)
+    if len(df) >= etl_bi_clean.XLSX_MAX_ROWS:
+        raise SystemExit(f"❌ xlsx limité à {etl_bi_clean.XLSX_MAX_ROWS - 1:,} lignes : utiliser .csv ou .parquet")
+    df.to_excel(path, index=False, sheet_name=etl_bi_clean.XLSX_SHEET)
+
+def generate(rows, path, seed=SEED, block_persons=BLOCK_PERSONS):
+    """Écrit `rows` lignes dans `path` (format d'après l'extension) ; retourne le chemin."""
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise SystemExit(f"Format non supporté : {path} ({', '.join(FORMATS)})")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp" + os.path.splitext(path)[1]
+    blocks = iter_blocks(rows, seed, block_persons)
+    if fmt == "parquet":
+        _write_parquet(blocks, tmp)
+    elif fmt == "xlsx":
+        _write_xlsx(blocks, tmp)
+    else:
+        _write_csv(blocks, tmp, fmt == "csv.gz")
+    os.replace(tmp, path)
+    return path
+
+def main():
+    ap = argparse.ArgumentParser(description="Source synthétique bruitée (colonnes de source_bruit_1000_final.xlsx)")
+    ap.add_argument("rows", type=int, help="nombre de lignes (10 000 à 10 000 000)")
+    ap.add_argument("-o", "--out", help="fichier de sortie .csv, .csv.gz, .parquet ou .xlsx "
+                                        "(défaut : benchmarks/data/source_<rows>.csv)")
+    ap.add_argument("--seed", type=int, default=SEED)
+    args = ap.parse_args()
+    out = args.out or os.path.join("benchmarks", "data", f"source_{args.rows}.csv")
+    t0 = time.perf_counter()
+    generate(args.rows, out, args.seed)
+    print(f"✅ {out} ({args.rows:,} lignes, {os.path.getsize(out) / 2**20:.1f} Mo, {time.perf_counter() - t0:.2f}s)")
+
+if __name__ == "__main__":
+    main()
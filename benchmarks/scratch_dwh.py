@@ -0,0 +1,89 @@
+# benchmarks/scratch_dwh.py
+# Schémas jetables bench_ods / bench_dwh pour mesurer les étapes de build_dwh sur des
+# données synthétiques, sans toucher à ods / dwh.
+import os, re, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import build_dwh
+import etl_to_ods
+
+MATIERES = ["Mathématiques", "Physique", "Chimie", "Informatique", "Anglais", "Histoire",
+            "Économie", "Gestion", "Droit", "Biologie", "Statistiques", "Marketing"]
+ECOLES = ["École Centrale", "INSA", "Polytech", "ESIEE", "EPITA"]
+PAYS = ["France", "Belgique", "Suisse", "Canada", "Maroc", "Sénégal", "Allemagne"]
+
+def scratch(sql):
+    """Même SQL, dans les schémas de test."""
+    return re.sub(r"\b(ods|dwh)\.", r"bench_\1.", sql)
+
+def make_source(cur, n, years=3):
+    """n élèves-années synthétiques : 3 années par élève (parmi `years` années à partir de 2021),
+    1 à 3 matières (espaces, doublons), projets à description longue, stages et employeurs
+    avec une part de NULL."""
+    cols = ", ".join(f"{c} {etl_to_ods.COL_TYPES[c]}" for c in etl_to_ods.COLS)
+    pick = lambda values, k: f"(ARRAY{values!r})[1 + (g * {k}) % {len(values)}]"
+    cur.execute(f"""
+        DROP SCHEMA IF EXISTS bench_ods CASCADE;
+        DROP SCHEMA IF EXISTS bench_dwh CASCADE;
+        CREATE SCHEMA bench_ods;
+        CREATE SCHEMA bench_dwh;
+        CREATE TABLE bench_ods.etudiants_clean ({cols});
+        INSERT INTO bench_ods.etudiants_clean
+        SELECT 'Nom' || (g / 3), 'Prénom' || (g / 3), DATE '1990-01-01' + (g / 3) % 5000, 2021 + g % {years},
+               {pick(PAYS, 1)},
+               {pick(ECOLES, 3)},
+               CASE g % 4
+                 WHEN 0 THEN {pick(MATIERES, 7)}
+                 WHEN 1 THEN {pick(MATIERES, 7)} || ' ; ' || {pick(MATIERES, 11)}
+                 WHEN 2 THEN {pick(MATIERES, 5)} || ';' || {pick(MATIERES, 13)} || ' ;' || {pick(MATIERES, 5)}
+                 ELSE NULL END,
+               'Projet ' || (g / 3) % 20000,
+               repeat('Description détaillée du projet, objectifs et livrables. ', 4) || (g / 3) % 20000,
+               CASE WHEN g % 7 = 0 THEN NULL ELSE (g / 3) % 2 = 0 END,
+               CASE WHEN g % 5 < 2 THEN 'Entreprise ' || (g / 3) % 3000 END,
+               CASE WHEN g % 5 < 2 THEN {pick(PAYS, 17)} END,
+               CASE WHEN g % 5 < 2 THEN DATE '2015-01-01' + (g / 3) % 2000 END,
+               CASE WHEN g % 3 <> 0 THEN 'Stage SA ' || (g / 3) % 5000 END,
+               CASE WHEN g % 3 <> 0 THEN {pick(PAYS, 19)} END,
+               CASE WHEN g % 3 <> 0 THEN DATE '2022-01-01' + (g / 3) % 300 END,
+               CASE WHEN g % 3 <> 0 THEN DATE '2022-06-01' + (g / 3) % 300 END
+        FROM generate_series(0, {n - 1}) g;
+        ANALYZE bench_ods.etudiants_clean;
+    """)
+
+def build_dimensions(cur):
+    """DDL + STEPS_SQL de build_dwh dans bench_dwh."""
+    cur.execute(scratch(build_dwh.DDL).replace("CREATE SCHEMA IF NOT EXISTS dwh;", ""))
+    for sql, name in build_dwh.STEPS_SQL:
+        cur.execute(scratch(sql))
+        cur.execute(f"ANALYZE bench_dwh.{name}")
+
+def create_partitions(cur, years):
+    """Partitions vides de fait_annee (insertions directes dans la table partitionnée)."""
+    for annee in years:
+        cur.execute(scratch(f"CREATE TABLE IF NOT EXISTS dwh.{build_dwh.partition_name(annee)} "
+                            f"PARTITION OF dwh.fait_annee FOR VALUES IN ({int(annee)})"))
+
+def build_facts(cur, years):
+    """_ods_fait, dimension_matiere, fait_annee (une partition par année) puis le modèle matières
+    normalisé (dimension_matiere_norm + bridge_fait_matiere), comme la reconstruction complète."""
+    cur.execute(scratch(build_dwh.ODS_FAIT_SQL))
+    cur.execute(scratch(build_dwh.MATIERE_SQL))
+    for annee in years:
+        table = f"dwh.{build_dwh.partition_name(annee)}"
+        cur.execute(scratch(build_dwh.load_year_sql(annee, table) + build_dwh.attach_year_sql(annee, table)))
+    cur.execute(scratch(build_dwh.MATIERE_NORM_SQL))
+    for annee in years:
+        fact, table = f"dwh.{build_dwh.partition_name(annee)}", f"dwh.{build_dwh.partition_name(annee, 'bridge_fait_matiere')}"
+        cur.execute(scratch(build_dwh.load_bridge_year_sql(annee, table, fact)
+                            + build_dwh.attach_year_sql(annee, table, "bridge_fait_matiere")))
+    cur.execute("ANALYZE bench_dwh.fait_annee; ANALYZE bench_dwh.dimension_matiere; "
+                "ANALYZE bench_dwh.dimension_matiere_norm; ANALYZE bench_dwh.bridge_fait_matiere;")
+
+def build_materialized(cur):
+    """Vue aplatie et synthèses matérialisées (lues par l'export)."""
+    for name, select, key, _ in build_dwh.MATERIALIZED:
+        cur.execute(scratch(build_dwh.materialized_sql(name, select, key)))
+
+def drop(cur):
+    cur.execute("DROP SCHEMA IF EXISTS bench_ods CASCADE; DROP SCHEMA IF EXISTS bench_dwh CASCADE;")
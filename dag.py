@@ -0,0 +1,97 @@
+# dag.py
+# Petit ordonnanceur de graphe de dépendances pour les étapes SQL.
+#
+# Chaque étape déclare ce qu'elle lit (inputs) et ce qu'elle produit (outputs) ; une étape
+# dépend de toutes celles qui produisent l'une de ses entrées (les entrées que personne ne
+# produit, comme la table ODS, sont externes). Les étapes prêtes tournent en parallèle dans
+# des threads, chacune sur sa propre connexion d'un pool borné et dans sa propre transaction
+# (commit à la sortie du `with pool.connection()`). Au premier échec plus rien n'est lancé,
+# les étapes en cours se terminent et l'exception est relevée.
+# En fin de course : chronologie par étape et chemin critique (plus longue chaîne de
+# dépendances en durée, c'est elle qui borne le temps total quel que soit le parallélisme).
+# Avec --profile, chaque étape est aussi un bloc du rapport de profilage (profiling.span).
+import time
+import profiling
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+TIMELINE_WIDTH = 40
+
+class Step:
+    def __init__(self, name, run, inputs=(), outputs=()):
+        self.name = name
+        self.run = run                  # run(cur)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+
+def dependencies(steps):
+    """{nom d'étape: ensemble des noms d'étapes dont elle dépend} ; refuse les sorties en double."""
+    producer = {}
+    for s in steps:
+        for out in s.outputs:
+            if out in producer:
+                raise ValueError(f"{out} produit par {producer[out]} et {s.name}")
+            producer[out] = s.name
+    return {s.name: {producer[i] for i in s.inputs if i in producer and producer[i] != s.name} for s in steps}
+
+def _timed_step(pool, step):
+    start = time.perf_counter()
+    with profiling.span(step.name), pool.connection() as conn:
+        step.run(conn.cursor())
+    return start, time.perf_counter()
+
+def run(steps, pool, jobs):
+    """Exécute les étapes en respectant les dépendances, au plus `jobs` à la fois.
+
+    Retourne {nom: (début, fin)} en secondes (perf_counter)."""
+    deps = dependencies(steps)
+    pending = {s.name: s for s in steps}
+    running, done, times, error = {}, set(), {}, None
+    with ThreadPoolExecutor(max(1, jobs)) as ex:
+        while running or (pending and error is None):
+            if error is None:
+                for name in [n for n in pending if deps[n] <= done]:
+                    running[ex.submit(profiling.bind(_timed_step), pool, pending.pop(name))] = name
+            if not running:
+                raise ValueError(f"dépendances circulaires entre : {', '.join(sorted(pending))}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                try:
+                    times[name] = fut.result()
+                    done.add(name)
+                except Exception as exc:
+                    error = error or exc
+    if error is not None:
+        raise error
+    return times
+
+def critical_path(steps, times):
+    """Chaîne de dépendances la plus longue en durée cumulée (liste de noms, dans l'ordre)."""
+    deps = dependencies(steps)
+    cost, prev = {}, {}
+    for name in sorted(times, key=lambda n: times[n][1]):  # une étape finit après ses dépendances
+        best = max(deps[name], key=lambda d: cost[d], default=None)
+        cost[name] = times[name][1] - times[name][0] + (cost[best] if best else 0.0)
+        prev[name] = best
+    name, path = max(cost, key=cost.get, default=None), []
+    while name:
+        path.append(name)
+        name = prev[name]
+    return path[::-1]
+
+def print_timeline(steps, times, width=TIMELINE_WIDTH):
+    if not times:
+        return
+    t0 = min(start for start, _ in times.values())
+    total = max(end for _, end in times.values()) - t0 or 1e-9
+    critical = critical_path(steps, times)
+    pad = max(len(n) for n in times)
+    print("⏱️  Chronologie (★ = chemin critique) :")
+    for name, (start, end) in sorted(times.items(), key=lambda kv: kv[1]):
+        a = int((start - t0) / total * width)
+        b = max(a + 1, int(round((end - t0) / total * width)))
+        bar = " " * a + "█" * (b - a) + " " * (width - b)
+        mark = "★" if name in critical else " "
+        print(f"  {mark} {name:<{pad}}  {start - t0:7.2f}s → {end - t0:7.2f}s  |{bar}|")
+    cp = sum(times[n][1] - times[n][0] for n in critical)
+    print(f"   chemin critique : {' → '.join(critical)} ({cp:.2f}s sur {total:.2f}s au total)")
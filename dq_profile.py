@@ -0,0 +1,239 @@
+# dq_profile.py
+# Profil qualité calculé pendant le nettoyage, sans passe supplémentaire sur les données
+# (data_quality_report.json, clé "profil") :
+#   - par nettoyeur de clean_rows : lignes rejetées (date illisible pour parse_date, None de
+#     to_bool, année non numérique), modifiées (espaces, casse), stages complétés par
+#     l'entreprise, dates de stage inversées
+#   - par colonne de la sortie (élève-années, avant mise en forme) : valeurs nulles, nombre de
+#     valeurs distinctes (HyperLogLog), valeurs les plus fréquentes (count-min + top-k)
+# Comptage des nettoyeurs : une colonne de texte est factorisée une fois, le nettoyeur tourne
+# sur ses valeurs distinctes (résultat redistribué sur les lignes, identique) et chaque valeur
+# distinct compte pour son nombre de lignes ; le profil ne coûte donc presque rien en plus.
+# Les esquisses ont une taille fixe et se fusionnent (max des registres HLL, somme des tables
+# count-min) : un profil par bloc (--stream) ou par worker (--workers), réunis avec merge(),
+# donnent les mêmes comptages et distincts qu'un profil global. Top : les candidates (valeurs
+# les plus fréquentes de chaque bloc) gardent leur compte exact, sommé à la fusion ; un bloc
+# où une valeur n'était pas candidate n'ajoute qu'une majoration (lignes_max, par le count-min).
+# En mémoire (un seul bloc) le top est exact.
+import numpy as np
+import pandas as pd
+
+HLL_P = 14            # 2^14 registres : erreur type ~0,8 %
+CMS_WIDTH = 1 << 14     # erreur count-min <= ~e / largeur des lignes (surestimation seulement)
+CMS_DEPTH = 4
+TOP_K = 10
+CANDIDATES = 4        # candidats gardés pour le top : CANDIDATES × TOP_K
+
+REJECTING = {"parse_date", "to_bool", "to_numeric"}   # nettoyeurs qui rendent nul ce qu'ils ne lisent pas
+
+def _present(s):
+    """Ni nul ni chaîne vide."""
+    vals = s.to_numpy(dtype=object) if s.dtype == object else None
+    return s.notna().to_numpy() & (vals != "" if vals is not None else True)
+
+def hash_values(values):
+    """Hachages 64 bits (uint64) de valeurs distinctes ; dates hachées sur leur entier."""
+    arr = np.asarray(values)
+    if arr.dtype.kind == "M":
+        arr = arr.view("int64")
+    elif arr.dtype.kind not in "iub":
+        arr = arr.astype(object)
+    return pd.util.hash_array(arr, categorize=False)
+
+def _label(value):
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, (np.bool_, np.integer)):
+        return value.item()
+    return value
+
+class HyperLogLog:
+    def __init__(self, p=HLL_P):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, hashes):
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)     # < 2^53 : exact en float64
+        bits = np.frexp(rest.astype(np.float64))[1]               # longueur en bits (0 pour 0)
+        np.maximum.at(self.registers, idx, (64 - self.p - bits + 1).astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        m = len(self.registers)
+        est = 0.7213 / (1 + 1.079 / m) * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int((self.registers == 0).sum())
+        if est <= 2.5 * m and zeros:
+            est = m * np.log(m / zeros)   # petites cardinalités : comptage linéaire
+        return int(round(est))
+
+class CountMinTopK:
+    """Valeurs les plus fréquentes : lignes exactes des candidates ; le count-min (mise à jour
+    conservatrice, jamais sous-estimé) majore celles des blocs où une valeur n'était pas candidate."""
+    def __init__(self, k=TOP_K, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.k, self.width = k, width
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+        self.candidates = {}   # hachage -> [valeur, lignes exactes, majoration des lignes non comptées]
+
+    def _cells(self, hashes):
+        h1, h2 = hashes & np.uint64(0xFFFFFFFF), hashes >> np.uint64(32)
+        return [((h1 + np.uint64(d) * h2) % np.uint64(self.width)).astype(np.int64) for d in range(len(self.table))]
+
+    def estimate(self, hashes):
+        if not self.total or not len(hashes):
+            return np.zeros(len(hashes), dtype=np.int64)
+        return np.min([row[cells] for row, cells in zip(self.table, self._cells(hashes))], axis=0)
+
+    def error_bound(self):
+        """Surestimation du count-min au plus e·N / largeur (probabilité 1 - e^-profondeur)."""
+        return int(np.ceil(np.e * self.total / self.width))
+
+    def add(self, hashes, counts, values):
+        """Un bloc : hachages et lignes exactes de toutes ses valeurs distinctes, par lignes
+        décroissantes ; values : les premières, qui deviennent candidates."""
+        if self.candidates:   # candidates déjà suivies : leur compte exact dans le bloc (0 si absentes)
+            order = np.argsort(hashes)
+            keys = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+            pos = np.minimum(np.searchsorted(hashes[order], keys), len(hashes) - 1)
+            found = hashes[order][pos] == keys
+            for h, p, ok in zip(keys, order[pos], found):
+                if ok:
+                    self.candidates[int(h)][1] += int(counts[p])
+        head = hashes[:len(values)]
+        before = self.estimate(head)   # blocs précédents : majoration pour les nouvelles candidates
+        for h, v, n, b in zip(head, values, counts, before):
+            self.candidates.setdefault(int(h), [v, int(n), int(b)])
+        # mise à jour conservatrice : chaque cellule monte au plus à estimation + lignes du bloc
+        target = self.estimate(hashes) + counts
+        for row, cells in zip(self.table, self._cells(hashes)):
+            np.maximum.at(row, cells, target)
+        self.total += int(counts.sum())
+        self._prune()
+
+    def _prune(self):
+        if len(self.candidates) > CANDIDATES * self.k:
+            ranked = sorted(self.candidates.items(), key=lambda kv: (-kv[1][1], kv[1][2]))
+            self.candidates = dict(ranked[:CANDIDATES * self.k])
+
+    def merge(self, other):
+        mine = {h: int(n) for h, n in zip(other.candidates, self.estimate(
+            np.fromiter(other.candidates, dtype=np.uint64, count=len(other.candidates))))}
+        theirs = {h: int(n) for h, n in zip(self.candidates, other.estimate(
+            np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))))}
+        for h, c in self.candidates.items():
+            if h in other.candidates:
+                c[1] += other.candidates[h][1]
+                c[2] += other.candidates[h][2]
+            else:
+                c[2] += theirs[h]
+        for h, (v, n, extra) in other.candidates.items():
+            if h not in self.candidates:
+                self.candidates[h] = [v, n, extra + mine[h]]
+        self.table += other.table
+        self.total += other.total
+        self._prune()
+
+    def top(self):
+        """[(valeur, lignes exactes, majoration)] des k premières par lignes exactes."""
+        ranked = sorted(self.candidates.values(), key=lambda c: (-c[1], c[2]))[:self.k]
+        return [(v, n, n + extra) for v, n, extra in ranked]
+
+class ColumnProfile:
+    def __init__(self):
+        self.rows, self.nulls = 0, 0
+        self.hll, self.freq = HyperLogLog(), CountMinTopK()
+
+    def observe(self, s):
+        vc = s.value_counts(dropna=False, sort=True)   # une passe : valeurs distinctes et lignes
+        na = vc.index.isna()
+        self.nulls += int(vc[na].sum())
+        vc = vc[~na]
+        self.rows += len(s)
+        if vc.empty:
+            return
+        hashes = hash_values(vc.index.to_numpy())
+        self.hll.add(hashes)
+        head = min(CANDIDATES * self.freq.k, len(vc))
+        self.freq.add(hashes, vc.to_numpy(dtype=np.int64), [_label(v) for v in vc.index[:head]])
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.hll.merge(other.hll)
+        self.freq.merge(other.freq)
+
+    def to_dict(self):
+        # lignes : occurrences comptées exactement ; lignes_max : plus les blocs où la valeur
+        # n'était pas candidate (majorées par le count-min), égal à lignes en mémoire
+        return {"nuls": self.nulls, "taux_nuls": round(self.nulls / self.rows, 4) if self.rows else None,
+                "distincts_approx": self.hll.count() if self.rows > self.nulls else 0,
+                "top": [{"valeur": v, "lignes": n, "lignes_max": m} for v, n, m in self.freq.top()],
+                "erreur_count_min": self.freq.error_bound()}
+
+class DQProfile:
+    """Profil d'un ou plusieurs blocs de lignes nettoyées (fusionnable, picklable)."""
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+        self.cleaners = {}
+
+    def count(self, name, **counts):
+        entry = self.cleaners.setdefault(name, {})
+        for key, n in counts.items():
+            entry[key] = entry.get(key, 0) + int(n)
+
+    def cleaner(self, helper, col, before, after, counts=None):
+        """Lignes rejetées / modifiées par un nettoyeur de clean_rows (avant -> après) ; counts :
+        lignes par valeur quand before / after sont les valeurs distinctes."""
+        name = f"{helper}[{col}]"
+        weight = (lambda mask: counts[mask].sum()) if counts is not None else (lambda mask: mask.sum())
+        if helper in REJECTING:
+            self.count(name, rejetees=weight(_present(before) & after.isna().to_numpy()))
+        elif helper == "coalesce":
+            self.count(name, completees=weight(~_present(before) & _present(after)))
+        else:
+            out = after.to_numpy(dtype=object)
+            self.count(name, modifiees=weight(pd.notna(out) & (out != before.to_numpy(dtype=object))))
+
+    def apply(self, helper, col, fn, s):
+        """fn(s) en comptant ses effets. Colonne de chaînes : fn sur les valeurs distinctes
+        seulement (nettoyeurs valeur par valeur : même résultat) ; sinon sur la colonne."""
+        if s.dtype != object or pd.api.types.infer_dtype(s, skipna=True) != "string":
+            out = fn(s)
+            self.cleaner(helper, col, s, out)
+            return out
+        codes, uniques = pd.factorize(s)           # valeurs nulles : code -1
+        before = pd.Series(uniques, dtype=object)
+        missing = codes < 0
+        if missing.any():                          # même valeur nulle (None / NaN) qu'en entrée
+            before = pd.concat([before, s[missing].iloc[:1]], ignore_index=True)
+            codes = np.where(missing, len(uniques), codes)
+        after = fn(before)
+        counts = np.bincount(codes, minlength=len(before))
+        self.cleaner(helper, col, before, after, counts)
+        return pd.Series(after.to_numpy()[codes], index=s.index, dtype=after.dtype)
+
+    def observe(self, df):
+        self.rows += len(df)
+        for c in df.columns:
+            self.columns.setdefault(c, ColumnProfile()).observe(df[c])
+
+    def merge(self, other):
+        self.rows += other.rows
+        for c, col in other.columns.items():
+            if c in self.columns:
+                self.columns[c].merge(col)
+            else:
+                self.columns[c] = col
+        for name, counts in other.cleaners.items():
+            self.count(name, **counts)
+        return self
+
+    def to_dict(self):
+        return {"lignes": self.rows,
+                "colonnes": {c: col.to_dict() for c, col in self.columns.items()},
+                "nettoyage": self.cleaners,
+                "esquisses": {"hll_registres": 1 << HLL_P, "count_min": [CMS_DEPTH, CMS_WIDTH], "top_k": TOP_K}}
@@ -0,0 +1,442 @@
+# dwh_api.py
+# Service HTTP de consultation du DWH, en lecture seule, pour les tableaux de bord :
+#
+#   python dwh_api.py [--host 127.0.0.1] [--port 8080] [--pool 8] [--ttl 300] [--cache-entries 256]
+#
+#   GET /comptes?par=annee,ecole[&annee=2021][&ecole=…][&matiere=…][&pays=…][&format=csv]
+#       élèves-années (nb_faits) et élèves distincts (nb_etudiants) par découpage de fait_annee :
+#       annee, ecole, matiere (modèle normalisé, une ligne par matière), pays (du stage : ne
+#       garde que les faits avec stage, comme dwh.synthese_stage_pays). Un filtre répété
+#       (annee=2021&annee=2022) porte sur plusieurs valeurs. Les découpages déjà matérialisés
+#       par build_dwh (annee × ecole, annee × pays) sont lus dans les synthèses.
+#   GET /faits?annee=2021[&ecole=…][&matiere=…][&pays=…][&limit=1000][&format=csv]
+#       lignes de la vue aplatie dwh.flat (mêmes colonnes et même ordre que l'export CSV)
+#   GET /sante
+#       pool, cache et dernier rafraîchissement du DWH (jamais en cache)
+#
+# Réponses en flux (Transfer-Encoding: chunked), JSON (tableau d'objets) ou CSV (COPY TO STDOUT,
+# même format que export_dwh_to_csv) : la mémoire ne dépend pas de la taille du résultat.
+# Connexions : un pool asyncio borné (psycopg_pool), sessions en lecture seule avec délai
+# maximal par requête. Cache : LRU en mémoire à durée de vie (TTL) des réponses complètes
+# jusqu'à ENTRY_BYTES ; deux demandes identiques simultanées ne lancent qu'une requête (la
+# seconde attend la réponse de la première). build_dwh envoie NOTIFY DWH_CHANNEL à la fin de
+# chaque (re)construction : le service l'écoute (LISTEN) et vide le cache ; les réponses en
+# cours de calcul à ce moment ne sont pas mises en cache.
+import sys, json, time, asyncio, argparse
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import urlsplit, parse_qs
+import psycopg
+from psycopg import sql
+from psycopg_pool import PoolTimeout
+from db import DATABASE_URL, DWH_CHANNEL, open_async_pool
+
+HOST, PORT = "127.0.0.1", 8080
+POOL_SIZE = 8                     # connexions PostgreSQL (requêtes simultanées)
+POOL_TIMEOUT = 5.0                # attente d'une connexion libre avant 503
+STATEMENT_TIMEOUT_MS = 30_000
+TTL = 300                         # secondes ; le NOTIFY de build_dwh invalide avant
+CACHE_ENTRIES = 256               # 0 : sans cache
+CACHE_BYTES = 64 << 20            # taille totale des réponses en cache
+ENTRY_BYTES = 4 << 20             # réponse plus grosse : servie en flux, pas mise en cache
+CHUNK_BYTES = 64 << 10            # morceaux envoyés au client
+FETCH_ROWS = 2000                 # /faits en JSON : lignes lues par FETCH (curseur serveur)
+KEEPALIVE_S = 15                  # connexion HTTP inactive fermée après
+LISTEN_RETRY_S = 5
+
+SESSION_OPTIONS = f"-c default_transaction_read_only=on -c statement_timeout={STATEMENT_TIMEOUT_MS}"
+CONTENT_TYPES = {"json": "application/json; charset=utf-8", "csv": "text/csv; charset=utf-8"}
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+          500: "Internal Server Error", 503: "Service Unavailable"}
+
+# ========= Requêtes =========
+# découpage -> (expression, jointure nécessaire) ; la matière passe par le pont normalisé
+CUTS = {
+    "annee": ("f.annee", None),
+    "ecole": ("ec.nom_ecole", "LEFT JOIN dwh.dimension_ecole ec ON ec.id_ecole = f.id_ecole"),
+    "pays": ("st.pays", "JOIN dwh.dimension_info_stage st ON st.id_stage = f.id_stage"),
+    "matiere": ("m.nom_matiere", "LEFT JOIN dwh.bridge_fait_matiere b ON b.id_template = f.id_template AND b.annee = f.annee\n"
+                                 "LEFT JOIN dwh.dimension_matiere_norm m ON m.id_matiere = b.id_matiere"),
+}
+# filtre matière sans découpage par matière : EXISTS (un fait à plusieurs matières compte une fois)
+MATIERE_FILTER = """EXISTS (SELECT 1 FROM dwh.bridge_fait_matiere b
+                           JOIN dwh.dimension_matiere_norm m ON m.id_matiere = b.id_matiere
+                           WHERE b.id_template = {t}.id_template AND b.annee = {t}.annee
+                             AND m.nom_matiere = ANY(%s))"""
+
+# découpages matérialisés par build_dwh (MATERIALIZED) : {découpage: (vue, colonnes, nb_faits)}
+SYNTHESES = {
+    frozenset({"annee", "ecole"}): ("synthese_annee_ecole", {"annee": "annee", "ecole": "nom_ecole"}, "nb_faits"),
+    frozenset({"annee", "pays"}): ("synthese_stage_pays", {"annee": "annee", "pays": "stage_pays"}, "nb_stages"),
+}
+
+FLAT_COLS = ["id_template", "annee", "nom", "prenom", "date_naissance", "nationalite", "nom_ecole",
+             "stage_pays", "stage_entreprise", "stage_debut", "stage_fin", "nom_projet", "description",
+             "publier", "matieres"]
+FLAT_FILTERS = {"annee": "annee", "ecole": "nom_ecole", "pays": "stage_pays"}
+
+class BadRequest(ValueError):
+    pass
+
+def _filters(params):
+    """Filtres communs : {découpage: [valeurs]} (annee en entier)."""
+    out = {}
+    for cut in CUTS:
+        values = params.get(cut)
+        if values:
+            if cut == "annee":
+                try:
+                    values = [int(v) for v in values]
+                except ValueError:
+                    raise BadRequest(f"annee doit être un entier : {', '.join(values)}")
+            out[cut] = sorted(set(values))
+    return out
+
+def comptes_query(params):
+    """(requête, paramètres) de /comptes."""
+    par = [c.strip() for v in params.get("par", ["annee"]) for c in v.split(",") if c.strip()]
+    unknown = [c for c in par if c not in CUTS]
+    if unknown or not par or len(set(par)) != len(par):
+        raise BadRequest(f"par : découpages distincts parmi {', '.join(CUTS)}")
+    filters = _filters(params)
+    synthese = SYNTHESES.get(frozenset(par))
+    if synthese and set(filters) <= set(par):
+        view, cols, nb_faits = synthese
+        where = [sql.SQL("{} = ANY(%s)").format(sql.Identifier(cols[c])) for c in filters]
+        query = sql.SQL("SELECT {cols}, {nb} AS nb_faits, nb_etudiants FROM {view}{where} ORDER BY {order}").format(
+            cols=sql.SQL(", ").join(sql.SQL("{} AS {}").format(sql.Identifier(cols[c]), sql.Identifier(c)) for c in par),
+            nb=sql.Identifier(nb_faits), view=sql.Identifier("dwh", view),
+            where=sql.SQL(" WHERE ") + sql.SQL(" AND ").join(where) if where else sql.SQL(""),
+            order=sql.SQL(", ").join(sql.Identifier(c) for c in par))
+        return query, list(filters.values())
+
+    joins = [CUTS[c][1] for c in CUTS if CUTS[c][1] and (c in par or (c in filters and c != "matiere"))]
+    where = [f"{CUTS[c][0]} = ANY(%s)" if c != "matiere" or c in par else MATIERE_FILTER.format(t="f")
+             for c in filters]
+    query = (f"SELECT {', '.join(f'{CUTS[c][0]} AS {c}' for c in par)},\n"
+             f"       COUNT(*) AS nb_faits, COUNT(DISTINCT f.id_etudiant) AS nb_etudiants\n"
+             f"FROM dwh.fait_annee f\n" + "".join(j + "\n" for j in joins)
+             + (f"WHERE {' AND '.join(where)}\n" if where else "")
+             + f"GROUP BY {', '.join(CUTS[c][0] for c in par)}\nORDER BY {', '.join(par)}")
+    return sql.SQL(query), list(filters.values())
+
+def faits_query(params, fmt):
+    """(requête, paramètres) de /faits ; en CSV, booléens en True/False comme l'export."""
+    filters = _filters(params)
+    limit = params.get("limit", [None])[-1]
+    if limit is not None and not limit.isdigit():
+        raise BadRequest("limit doit être un entier positif")
+    cols = [f"CASE WHEN {c} THEN 'True' WHEN NOT {c} THEN 'False' END AS {c}" if fmt == "csv" and c == "publier" else c
+            for c in FLAT_COLS]
+    where = [f"{FLAT_FILTERS[c]} = ANY(%s)" if c != "matiere" else MATIERE_FILTER.format(t="fl") for c in filters]
+    query = (f"SELECT {', '.join(cols)} FROM dwh.flat fl"
+             + (f" WHERE {' AND '.join(where)}" if where else "")
+             + " ORDER BY id_etudiant, annee, id_template" + (f" LIMIT {int(limit)}" if limit is not None else ""))
+    return sql.SQL(query), list(filters.values())
+
+ENDPOINTS = {
+    # chemin -> (paramètres admis, construction de la requête, curseur serveur pour le JSON)
+    "/comptes": ({"par", "format", *CUTS}, lambda params, fmt: comptes_query(params), False),
+    "/faits": ({"limit", "format", *CUTS}, faits_query, True),
+}
+
+# ========= Encodage =========
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} non sérialisable")
+
+def _json_rows(names, rows, first):
+    body = ",\n".join(json.dumps(dict(zip(names, row)), ensure_ascii=False, default=_json_default) for row in rows)
+    return (("[\n" if first else ",\n") + body).encode("utf-8") if rows else b""
+
+async def stream_rows(conn, query, params, fmt, server_cursor):
+    """Morceaux (bytes, CHUNK_BYTES environ) du résultat de `query` au format `fmt`."""
+    if fmt == "csv":
+        copy_sql = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER, ENCODING 'UTF8')").format(query)
+        buf = bytearray()
+        async with conn.cursor().copy(copy_sql, params) as copy:
+            async for block in copy:     # un bloc par ligne : regroupés
+                buf += block
+                if len(buf) >= CHUNK_BYTES:
+                    yield bytes(buf)
+                    buf.clear()
+        if buf:
+            yield bytes(buf)
+        return
+    cur = conn.cursor(name="dwh_api") if server_cursor else conn.cursor()
+    async with cur:
+        await cur.execute(query, params)
+        names, first = None, True
+        while True:
+            rows = await cur.fetchmany(FETCH_ROWS)
+            if names is None:
+                names = [c.name for c in cur.description]
+            if not rows:
+                break
+            yield _json_rows(names, rows, first)
+            first = False
+    yield b"[]\n" if first else b"\n]\n"
+
+# ========= Cache =========
+class ResultCache:
+    """Réponses complètes, LRU à durée de vie ; `generation` change à chaque invalidation."""
+    def __init__(self, entries=CACHE_ENTRIES, ttl=TTL, max_bytes=CACHE_BYTES):
+        self.entries, self.ttl, self.max_bytes = entries, ttl, max_bytes
+        self.items = OrderedDict()   # clé -> (expiration, corps)
+        self.size = 0
+        self.generation = 0
+        self.hits = self.misses = self.invalidations = 0
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is not None and item[0] < time.monotonic():
+            self._drop(key)
+            item = None
+        if item is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key, body, generation):
+        """Ignoré si le DWH a changé depuis le début du calcul (generation périmée)."""
+        if generation != self.generation or not self.entries or len(body) > min(ENTRY_BYTES, self.max_bytes):
+            return
+        if key in self.items:
+            self._drop(key)
+        self.items[key] = (time.monotonic() + self.ttl, body)
+        self.size += len(body)
+        while len(self.items) > self.entries or self.size > self.max_bytes:
+            self._drop(next(iter(self.items)))
+
+    def _drop(self, key):
+        self.size -= len(self.items.pop(key)[1])
+
+    def clear(self):
+        self.items.clear()
+        self.size = 0
+        self.generation += 1
+        self.invalidations += 1
+
+    def stats(self):
+        return {"entrees": len(self.items), "octets": self.size, "hits": self.hits, "misses": self.misses,
+                "invalidations": self.invalidations, "ttl_s": self.ttl, "max_entrees": self.entries}
+
+# ========= HTTP =========
+async def read_request(reader):
+    """(méthode, cible, version, en-têtes) ou None si le client a fermé."""
+    line = await asyncio.wait_for(reader.readline(), KEEPALIVE_S)
+    if not line.strip():
+        return None
+    method, target, version = line.decode("latin-1").split()
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if int(headers.get("content-length", 0)):   # GET seulement : corps ignoré
+        await reader.readexactly(int(headers["content-length"]))
+    return method, target, version, headers
+
+def head(status, ctype, keep_alive, length=None, extra=()):
+    lines = [f"HTTP/1.1 {status} {STATUS[status]}", f"Content-Type: {ctype}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+    lines += [f"{k}: {v}" for k, v in extra]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+class Service:
+    def __init__(self, pool, cache, url=None):
+        self.pool, self.cache, self.url = pool, cache, url or DATABASE_URL
+        self.inflight = {}    # clé -> Future (corps complet, ou None si non partageable)
+        self.requests = 0
+
+    # ----- invalidation -----
+    async def listen(self):
+        """LISTEN DWH_CHANNEL : vide le cache à chaque fin de build_dwh (et après une coupure,
+        un NOTIFY a pu être manqué)."""
+        lost = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.url, autocommit=True) as conn:
+                    await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(DWH_CHANNEL)))
+                    if lost:
+                        self.cache.clear()
+                    lost = False
+                    async for note in conn.notifies():
+                        self.cache.clear()
+                        print(f"🔄 DWH rafraîchi ({note.payload}) : cache vidé")
+            except psycopg.OperationalError as exc:
+                lost = True
+                print(f"⚠️  Écoute {DWH_CHANNEL} interrompue ({exc}), nouvel essai dans {LISTEN_RETRY_S}s")
+                await asyncio.sleep(LISTEN_RETRY_S)
+
+    # ----- requêtes -----
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    return
+                if request is None:
+                    return
+                method, target, version, headers = request
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                self.requests += 1
+                if not await self.respond(writer, method, target, keep_alive) or not keep_alive:
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def error(self, writer, status, message, keep_alive):
+        body = json.dumps({"erreur": message}, ensure_ascii=False).encode("utf-8") + b"\n"
+        writer.write(head(status, CONTENT_TYPES["json"], keep_alive, len(body)) + body)
+        await writer.drain()
+        return True
+
+    async def respond(self, writer, method, target, keep_alive):
+        """Écrit la réponse ; False si la connexion doit être fermée (flux interrompu)."""
+        if method != "GET":
+            return await self.error(writer, 405, "GET seulement", keep_alive)
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        if url.path == "/sante":
+            return await self.health(writer, keep_alive)
+        if url.path not in ENDPOINTS:
+            return await self.error(writer, 404, f"{url.path} inconnu (/comptes, /faits, /sante)", keep_alive)
+        allowed, build, server_cursor = ENDPOINTS[url.path]
+        fmt = params.get("format", ["json"])[-1]
+        try:
+            if set(params) - allowed:
+                raise BadRequest(f"paramètre(s) inconnu(s) : {', '.join(sorted(set(params) - allowed))}")
+            if fmt not in CONTENT_TYPES:
+                raise BadRequest("format : json ou csv")
+            query, args = build(params, fmt)
+        except BadRequest as exc:
+            return await self.error(writer, 400, str(exc), keep_alive)
+
+        key = (url.path, fmt, tuple(sorted((k, tuple(sorted(v) if k in CUTS else v))
+                                           for k, v in params.items() if k != "format")))
+        body = self.cache.get(key)
+        state = "hit"
+        if body is None and key in self.inflight:
+            body = await asyncio.shield(self.inflight[key])   # même requête en cours : on attend sa réponse
+            state = "shared"
+        if body is not None:
+            writer.write(head(200, CONTENT_TYPES[fmt], keep_alive, len(body), [("X-Cache", state)]) + body)
+            await writer.drain()
+            return True
+        return await self.run_query(writer, key, query, args, fmt, server_cursor, keep_alive)
+
+    async def run_query(self, writer, key, query, args, fmt, server_cursor, keep_alive):
+        generation = self.cache.generation
+        shared = asyncio.get_running_loop().create_future()
+        self.inflight[key] = shared
+        kept, size, started, complete = [], 0, False, False
+
+        def release(body):
+            if not shared.done():
+                shared.set_result(body)
+            if self.inflight.get(key) is shared:
+                del self.inflight[key]
+
+        try:
+            async with self.pool.connection(timeout=POOL_TIMEOUT) as conn:
+                chunks = stream_rows(conn, query, args, fmt, server_cursor)
+                try:
+                    async for chunk in chunks:
+                        if not started:   # en-têtes après le 1er morceau : une erreur SQL reste une 500
+                            writer.write(head(200, CONTENT_TYPES[fmt], keep_alive, extra=[("X-Cache", "miss")]))
+                            started = True
+                        writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                        await writer.drain()
+                        if kept is not None:
+                            kept.append(chunk)
+                            size += len(chunk)
+                            if size > ENTRY_BYTES:   # trop gros pour le cache : les suivants ne l'attendent pas
+                                kept = None
+                                release(None)
+                    complete = True
+                finally:
+                    await chunks.aclose()
+        except PoolTimeout:
+            release(None)
+            return await self.error(writer, 503, "pas de connexion libre, réessayer", keep_alive)
+        except psycopg.Error as exc:
+            release(None)
+            if started:
+                return False   # flux déjà commencé : coupure, le client voit une réponse incomplète
+            print(f"❌ {key[0]} : {exc}")
+            return await self.error(writer, 500, str(exc).strip(), keep_alive)
+        finally:
+            if not complete:
+                release(None)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        body = b"".join(kept) if kept is not None else None
+        if body is not None:
+            self.cache.put(key, body, generation)
+        release(body)
+        return True
+
+    async def health(self, writer, keep_alive):
+        try:
+            async with self.pool.connection(timeout=POOL_TIMEOUT) as conn:
+                cur = await conn.execute("SELECT to_regclass('dwh.refresh_state') IS NOT NULL")
+                dwh = None
+                if (await cur.fetchone())[0]:
+                    cur = await conn.execute("SELECT last_batch_id, mode, refreshed_at FROM dwh.refresh_state")
+                    row = await cur.fetchone()
+                    dwh = dict(zip(["dernier_lot", "mode", "rafraichi_le"], row)) if row else None
+        except (PoolTimeout, psycopg.Error) as exc:
+            return await self.error(writer, 503, str(exc).strip(), keep_alive)
+        body = json.dumps({"dwh": dwh, "pool": self.pool.get_stats(), "cache": self.cache.stats(),
+                           "requetes": self.requests, "en_cours": len(self.inflight)},
+                          ensure_ascii=False, default=_json_default).encode("utf-8") + b"\n"
+        writer.write(head(200, CONTENT_TYPES["json"], keep_alive, len(body)) + body)
+        await writer.drain()
+        return True
+
+async def serve(args):
+    try:
+        pool = await open_async_pool(args.pool, options=SESSION_OPTIONS)
+    except PoolTimeout as exc:
+        raise SystemExit(f"❌ PostgreSQL injoignable ({DATABASE_URL}) : {exc}")
+    service = Service(pool, ResultCache(args.cache_entries, args.ttl, args.cache_mb << 20))
+    listener = asyncio.create_task(service.listen())
+    server = await asyncio.start_server(service.handle, args.host, args.port)
+    cache = f"cache {args.cache_entries} entrée(s), TTL {args.ttl}s" if args.cache_entries else "sans cache"
+    print(f"🌐 DWH en lecture sur http://{args.host}:{args.port} (/comptes, /faits, /sante) — "
+          f"pool {args.pool} connexion(s), {cache}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        listener.cancel()
+        await pool.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Service HTTP de consultation du DWH (lecture seule)")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--pool", type=int, default=POOL_SIZE, help="connexions PostgreSQL")
+    ap.add_argument("--ttl", type=float, default=TTL, help="durée de vie d'une réponse en cache (s)")
+    ap.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES, help="réponses en cache (0 : sans cache)")
+    ap.add_argument("--cache-mb", type=int, default=CACHE_BYTES >> 20, help="taille totale du cache (Mo)")
+    args = ap.parse_args(argv)
+    if sys.platform == "win32":   # psycopg asynchrone : pas de boucle Proactor
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("👋 Arrêt du service")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
-
-import os, re, unicodedata, json
+import os, re, unicodedata, json, argparse, functools, gzip, heapq, math, pickle, tempfile, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from datetime import datetime
+import ingest_cache
+import profiling
+from dq_profile import DQProfile
 
 # ========= Paramètres =========
 SRC = "source_bruit_1000_final.xlsx"   # chemin du fichier source
 OUT_DIR = "clean"                      # dossier de sortie
-os.makedirs(OUT_DIR, exist_ok=True)
+ENGINE = "vectorized"                  # "vectorized" (pandas .str / masques) ou "apply" (cellule par cellule)
+MEMORY_BUDGET_MB = 512                 # mode --stream : budget mémoire visé
+CACHE_DIR = ingest_cache.CACHE_DIR     # cache des classeurs déjà lus (None = désactivé)
+FORMATS = ["csv"]                      # sorties : csv, csv.gz, parquet, xlsx (xlsx seulement sur demande)
 
 # ========= Utilitaires =========
 def normalize_spaces(s):
@@ -28,6 +36,9 @@ def proper_case_name(x):
     return re.sub(r"\b(D|L|De|Du|Des|La|Le|Les|D')\b", lambda m: m.group(0).lower(), x)
 
 # Booléen robuste (1/0, 1.0/0.0, oui/non, true/false, ✓/✗, etc.)
+TRUTHY = {"true","vrai","oui","o","yes","y","1","t","x","✓","✔","publié","published"}
+FALSY  = {"false","faux","non","n","no","0","f","✗","×","non publié","unpublished"}
+
 def to_bool(x):
     if pd.isna(x): return None
     if isinstance(x, bool): return x
@@ -38,16 +49,16 @@ def to_bool(x):
     s = str(x).strip().lower()
     if re.fullmatch(r"1(\.0+)?", s): return True
     if re.fullmatch(r"0(\.0+)?", s): return False
-    truthy = {"true","vrai","oui","o","yes","y","1","t","x","✓","✔","publié","published"}
-    falsy  = {"false","faux","non","n","no","0","f","✗","×","non publié","unpublished"}
-    if s in truthy: return True
-    if s in falsy:  return False
+    if s in TRUTHY: return True
+    if s in FALSY:  return False
     return None
 
+DATE_FORMATS = ("%Y-%m-%d","%d/%m/%Y","%d-%m-%Y","%m/%d/%Y","%Y/%m/%d")
+
 def parse_date(x):
     if pd.isna(x) or x == "": return pd.NaT
     if isinstance(x, (pd.Timestamp, datetime)): return pd.to_datetime(x)
-    for fmt in ("%Y-%m-%d","%d/%m/%Y","%d-%m-%Y","%m/%d/%Y","%Y/%m/%d"):
+    for fmt in DATE_FORMATS:
         try: return pd.to_datetime(datetime.strptime(str(x), fmt))
         except: pass
     return pd.to_datetime(x, dayfirst=True, errors="coerce")
@@ -70,6 +81,161 @@ def agg_list_unique(series, sep="; "):
     vals = sorted(set([v.strip() for v in series.dropna().astype(str) if v.strip()]))
     return sep.join(vals) if vals else None
 
+# ========= Nettoyage vectorisé =========
+# Mêmes résultats que les fonctions ci-dessus, mais par colonne entière :
+# chaque valeur texte distincte n'est traitée qu'une fois (pd.factorize),
+# puis le résultat est redistribué sur les lignes par indexation numpy.
+
+def _type_mask(s, classes):
+    """Masque booléen isinstance(v, classes), évalué une fois par type présent."""
+    if classes is str and pd.api.types.infer_dtype(s, skipna=True) in ("string", "empty"):
+        return s.notna()   # cas courant : colonne texte homogène, pas de passe Python
+    codes, types = pd.factorize(s.map(type))
+    ok = np.array([issubclass(t, classes) for t in types], dtype=bool)
+    return pd.Series(ok[codes] if len(types) else np.zeros(len(s), bool), index=s.index)
+
+def _none_like(s):
+    return pd.Series(np.full(len(s), None, dtype=object), index=s.index)
+
+def _by_unique(s, transform):
+    """Applique `transform` (opérations .str) aux valeurs distinctes de `s` (que des str)."""
+    codes, uniques = pd.factorize(s)
+    res = transform(pd.Series(uniques, dtype=object))
+    return pd.Series(np.asarray(res, dtype=object)[codes], index=s.index, dtype=object)
+
+def _normalize_spaces_vec(s):
+    return s.str.strip().str.replace(r"\s+", " ", regex=True)
+
+def clean_text_vec(s):
+    vals = s.astype(object)
+    out = _none_like(s)
+    ok = vals.notna()
+    is_str = ok & _type_mask(vals, str)
+    out[is_str] = _by_unique(vals[is_str], _normalize_spaces_vec)
+    other = ok & ~is_str
+    if other.any():
+        out[other] = _normalize_spaces_vec(vals[other].astype(str))
+    return out
+
+def _proper_case_vec(u):
+    u = _normalize_spaces_vec(u.str.lower()).str.title()
+    return u.str.replace(r"\b(D|L|De|Du|Des|La|Le|Les|D')\b", lambda m: m.group(0).lower(), regex=True)
+
+def proper_case_name_vec(s):
+    out = s.astype(object).copy()
+    is_str = _type_mask(out, str)
+    out[is_str] = _by_unique(out[is_str], _proper_case_vec)
+    return out
+
+# Table de correspondance texte -> booléen (les motifs 1 / 1.0 / 0.00 sont traités à part)
+BOOL_LOOKUP = {**{v: True for v in TRUTHY}, **{v: False for v in FALSY}}
+
+def _to_bool_text(u):
+    s = u.str.strip().str.lower()
+    res = s.map(BOOL_LOOKUP).astype(object)
+    res[s.str.fullmatch(r"0(\.0+)?")] = False
+    res[s.str.fullmatch(r"1(\.0+)?")] = True
+    return res.astype(object).where(res.notna(), None)
+
+def to_bool_vec(s):
+    vals = s.astype(object)
+    out = _none_like(s)
+    ok = vals.notna()
+    is_bool = ok & _type_mask(vals, bool)
+    is_int = ok & ~is_bool & _type_mask(vals, int)
+    is_float = ok & _type_mask(vals, float)
+    if is_bool.any(): out[is_bool] = vals[is_bool]
+    if is_int.any():  out[is_int] = (vals[is_int] != 0).astype(object)
+    # float : bool(int(round(x))) ; round() arrondit au pair comme np.rint ; ±inf passe par le texte
+    if is_float.any():
+        f = vals[is_float].astype(float)
+        finite = np.isfinite(f)
+        out[f.index[finite]] = (np.rint(f[finite]) != 0).astype(object)
+        is_float[f.index[~finite]] = False
+    rest = ok & ~is_bool & ~is_int & ~is_float
+    if rest.any():
+        txt = vals[rest]
+        txt_str = _type_mask(txt, str)
+        if not txt_str.all():
+            txt = txt.where(txt_str, txt.astype(str))
+        out[rest] = _by_unique(txt, _to_bool_text)
+    return out
+
+# Motifs équivalents à ceux de datetime.strptime pour %Y, %m et %d
+_STRPTIME_RE = {"%Y": r"(?P<Y>\d\d\d\d)", "%m": r"(?P<m>1[0-2]|0[1-9]|[1-9])",
+                "%d": r"(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])"}
+
+def _format_regex(fmt):
+    return re.sub(r"%[Ymd]", lambda m: _STRPTIME_RE[m.group(0)], re.escape(fmt).replace("\\%", "%"))
+
+DATE_FORMAT_RE = {fmt: _format_regex(fmt) for fmt in DATE_FORMATS}
+
+# repli scalaire mémoïsé : en mode --stream les mêmes chaînes reviennent à chaque bloc
+_parse_date_cached = functools.lru_cache(maxsize=1 << 16)(parse_date)
+
+def _parse_date_text(u):
+    """Chaînes distinctes -> dates : les formats un par un sur les restes, puis repli scalaire."""
+    res = pd.Series(pd.NaT, index=u.index, dtype="datetime64[ns]")
+    todo = pd.Series(True, index=u.index)
+    for fmt in DATE_FORMATS:
+        if not todo.any(): break
+        parts = u[todo].str.extract("^" + DATE_FORMAT_RE[fmt] + r"\Z", flags=re.IGNORECASE).dropna()   # \Z et non $ : refuse un "\n" final, comme strptime
+        if parts.empty: continue
+        ymd = pd.DataFrame({"year": parts["Y"], "month": parts["m"], "day": parts["d"]}).astype("int64")
+        dates = pd.to_datetime(ymd, errors="coerce")
+        dates = dates[dates.notna()]   # 31/02 etc. : strptime échoue -> format suivant
+        res[dates.index] = dates
+        todo[dates.index] = False
+    if todo.any():
+        res[todo] = u[todo].map(_parse_date_cached)
+    return res
+
+def parse_date_vec(s):
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return pd.to_datetime(s)
+    vals = s.astype(object)
+    out = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    ok = vals.notna() & (vals != "")
+    is_str = ok & _type_mask(vals, str)
+    if is_str.any():
+        codes, uniques = pd.factorize(vals[is_str])
+        parsed = _parse_date_text(pd.Series(uniques, dtype=object))
+        out[is_str] = parsed.to_numpy()[codes]
+    is_dt = ok & ~is_str & _type_mask(vals, (pd.Timestamp, datetime))
+    if is_dt.any():
+        out[is_dt] = pd.to_datetime(vals[is_dt])
+    other = ok & ~is_str & ~is_dt
+    if other.any():
+        out[other] = vals[other].map(parse_date)
+    return out
+
+def coalesce_vec(*cols):
+    out = _none_like(cols[0])
+    todo = pd.Series(True, index=out.index)
+    for c in cols:
+        c = c.astype(object)
+        hit = todo & c.notna() & (c != "")
+        out[hit] = c[hit]
+        todo &= ~hit
+    return out
+
+CLEANERS = {
+    "apply": {
+        "clean_text": lambda s: s.apply(clean_text),
+        "proper_case_name": lambda s: s.apply(proper_case_name),
+        "to_bool": lambda s: s.apply(to_bool),
+        "parse_date": lambda s: s.apply(parse_date),
+        "coalesce": lambda df, a, b: df.apply(lambda r: coalesce(r.get(a), r.get(b)), axis=1),
+    },
+    "vectorized": {
+        "clean_text": clean_text_vec,
+        "proper_case_name": proper_case_name_vec,
+        "to_bool": to_bool_vec,
+        "parse_date": parse_date_vec,
+        "coalesce": lambda df, a, b: coalesce_vec(df[a], df[b]),
+    },
+}
+
 # ========= Lecture =========
 rename_map = {
     "Nom":"nom","Prénom":"prenom","Date_Naissance":"date_naissance","Nationalité":"nationalite",
@@ -77,38 +243,130 @@ rename_map = {
     "Publié":"publie","Entreprise":"entreprise","Pays_Entreprise":"pays_entreprise","Date_Embauche":"date_embauche",
     "Stage_Entreprise":"stage_entreprise","Stage_Pays":"stage_pays","Stage_Début":"stage_debut","Stage_Fin":"stage_fin"
 }
-df = pd.read_excel(SRC, sheet_name=0).rename(columns=rename_map)
+TEXT_COLS = ["nom","prenom","nationalite","ecole","matiere","projet","description_projet",
+             "entreprise","pays_entreprise","stage_entreprise","stage_pays"]
+DATE_COLS = ["date_naissance","date_embauche","stage_debut","stage_fin"]
+
+def _excel_cell(cell):
+    # même conversion que le lecteur openpyxl de pd.read_excel
+    if cell.value is None: return ""
+    if cell.data_type == "e": return np.nan
+    if cell.data_type == "n":
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+def _iter_excel(src, chunk_rows):
+    from openpyxl import load_workbook
+    from pandas.io.parsers import TextParser
+    wb = load_workbook(src, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows()
+        header = [_excel_cell(c) for c in next(rows)]
+        width, buf = len(header), []
+        for r in rows:
+            vals = [_excel_cell(c) for c in r][:width]
+            if all(v == "" for v in vals): continue
+            buf.append(vals + [""] * (width - len(vals)))
+            if len(buf) >= chunk_rows:
+                yield TextParser([header] + buf, header=0).read()
+                buf = []
+        if buf:
+            yield TextParser([header] + buf, header=0).read()
+    finally:
+        wb.close()
+
+def _iter_parquet(src, chunk_rows):
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(src).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+def _iter_arrow(path, chunk_rows):
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    for start in range(0, table.num_rows, chunk_rows):
+        yield table.slice(start, chunk_rows).to_pandas()
+
+def _read_excel(src):
+    return pd.read_excel(src, sheet_name=0)
+
+def iter_source(src=SRC, chunk_rows=100_000, cache_dir=CACHE_DIR):
+    """Lit la source (xlsx, csv ou parquet) par blocs d'au plus `chunk_rows` lignes."""
+    ext = os.path.splitext(src)[1].lower()
+    cached = ingest_cache.cached_frame_path(src, "sheet0", cache_dir) if cache_dir and ext in (".xlsx", ".xlsm") else None
+    if cached:
+        chunks = _iter_arrow(cached, chunk_rows)   # classeur déjà lu : memory-map du cache
+    elif ext in (".xlsx", ".xlsm"):
+        chunks = _iter_excel(src, chunk_rows)
+    elif ext == ".parquet":
+        chunks = _iter_parquet(src, chunk_rows)
+    elif ext in (".csv", ".gz", ".zst"):
+        chunks = pd.read_csv(src, chunksize=chunk_rows, encoding="utf-8")
+    else:
+        raise SystemExit(f"Format source non supporté : {src}")
+    start = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk.rename(columns=rename_map)
+
+@profiling.profiled
+def read_source(src=SRC, cache_dir=CACHE_DIR):
+    if os.path.splitext(src)[1].lower() in (".xlsx", ".xlsm", ".xls"):
+        if cache_dir:
+            raw = ingest_cache.cached_read(src, _read_excel, "sheet0", cache_dir)
+        else:
+            raw = _read_excel(src)
+        return raw.rename(columns=rename_map)
+    # csv / parquet : même lecteur par blocs que le mode --stream
+    return pd.concat(iter_source(src), ignore_index=True)
 
 # ========= Nettoyage de base =========
-for col in ["nom","prenom","nationalite","ecole","matiere","projet","description_projet",
-            "entreprise","pays_entreprise","stage_entreprise","stage_pays"]:
-    if col in df: df[col] = df[col].apply(clean_text)
+@profiling.profiled
+def clean_rows(df, engine=ENGINE, dq=None):
+    """dq (DQProfile) : compte au passage les lignes rejetées / modifiées par chaque helper."""
+    helpers = CLEANERS[engine]
+    # --profile : chaque helper est mesuré colonne par colonne ("clean_text[nom]")
+    def f(helper, col, *args):
+        with profiling.span(f"{helper}[{col}]", rows_in=len(df)) as rec:
+            if dq is None:
+                out = helpers[helper](*args)
+            elif helper == "coalesce":
+                out = helpers[helper](*args)
+                dq.cleaner(helper, col, args[0][col], out)
+            else:
+                out = dq.apply(helper, col, helpers[helper], *args)
+            if profiling.enabled():
+                rec.update(rows_out=len(out), non_null=int(out.notna().sum()))
+            return out
 
-df["nom"] = df["nom"].apply(proper_case_name)
-df["prenom"] = df["prenom"].apply(proper_case_name)
-df["annee"] = pd.to_numeric(df.get("annee"), errors="coerce").astype("Int64")
+    for col in TEXT_COLS:
+        if col in df: df[col] = f("clean_text", col, df[col])
 
-if "publie" in df:
-    df["publie"] = df["publie"].apply(to_bool).astype("boolean")
+    df["nom"] = f("proper_case_name", "nom", df["nom"])
+    df["prenom"] = f("proper_case_name", "prenom", df["prenom"])
+    annee = pd.to_numeric(df.get("annee"), errors="coerce").astype("Int64")
+    if dq is not None and "annee" in df:
+        dq.cleaner("to_numeric", "annee", df["annee"], annee)
+    df["annee"] = annee
 
-for col in ["date_naissance","date_embauche","stage_debut","stage_fin"]:
-    if col in df: df[col] = df[col].apply(parse_date)
+    if "publie" in df:
+        df["publie"] = f("to_bool", "publie", df["publie"]).astype("boolean")
 
-mask = df["stage_fin"].notna() & df["stage_debut"].notna() & (df["stage_fin"] < df["stage_debut"])
-df.loc[mask, ["stage_debut","stage_fin"]] = df.loc[mask, ["stage_fin","stage_debut"]].values
+    for col in DATE_COLS:
+        if col in df: df[col] = f("parse_date", col, df[col])
 
+    mask = df["stage_fin"].notna() & df["stage_debut"].notna() & (df["stage_fin"] < df["stage_debut"])
+    df.loc[mask, ["stage_debut","stage_fin"]] = df.loc[mask, ["stage_fin","stage_debut"]].values
+    profiling.note(stages_inverses=int(mask.sum()))
+    if dq is not None:
+        dq.count("stages_inverses", lignes=mask.sum())
 
-# Remplir stage_entreprise si vide avec entreprise
-df["stage_entreprise"] = df.apply(lambda r: coalesce(r.get("stage_entreprise"), r.get("entreprise")), axis=1)
+    # Remplir stage_entreprise si vide avec entreprise
+    df["stage_entreprise"] = f("coalesce", "stage_entreprise", df, "stage_entreprise", "entreprise")
+    return df
 
 # ========= Dédup & agrégation (Personne × Année) =========
-df["_key_year"] = df.apply(lambda r: "|".join([
-    strip_accents_lower(coalesce(r.get("nom",""))),
-    strip_accents_lower(coalesce(r.get("prenom",""))),
-    str(pd.to_datetime(r["date_naissance"]).date() if pd.notna(r.get("date_naissance")) else ""),
-    str(r["annee"]) if pd.notna(r.get("annee")) else ""
-]), axis=1)
-
 agg_dict_year = {
     "nom":"first",
     "prenom":"first",
@@ -128,37 +386,495 @@ agg_dict_year = {
     "stage_debut":"min",
     "stage_fin":"max",
 }
-clean = df.groupby("_key_year", dropna=False).agg(agg_dict_year).reset_index(drop=True)
 
-# ========= Post-traitements =========
+def person_year_key_str(df):
+    return df.apply(lambda r: "|".join([
+        strip_accents_lower(coalesce(r.get("nom",""))),
+        strip_accents_lower(coalesce(r.get("prenom",""))),
+        str(pd.to_datetime(r["date_naissance"]).date() if pd.notna(r.get("date_naissance")) else ""),
+        str(r["annee"]) if pd.notna(r.get("annee")) else ""
+    ]), axis=1)
+
+def strip_accents_lower_vec(s):
+    vals = s.astype(object)
+    out = pd.Series("", index=s.index, dtype=object)
+    ok = vals.notna() & (vals != "")
+    txt = vals[ok]
+    is_str = _type_mask(txt, str)
+    if not is_str.all():
+        txt = txt.where(is_str, txt.astype(str))
+    out[ok] = _by_unique(txt, lambda u: u.map(strip_accents_lower))
+    return out
 
-if "publie" in clean.columns:
-    clean["publie"] = clean["publie"].map({True: "True", False: "False"}).fillna("NULL")
+def person_year_key_parts(df):
+    """Les 4 composantes de la clé nom|prenom|date_naissance|annee, en colonnes."""
+    naiss = pd.to_datetime(df["date_naissance"])
+    return [
+        strip_accents_lower_vec(df["nom"]),
+        strip_accents_lower_vec(df["prenom"]),
+        naiss.dt.strftime("%Y-%m-%d").fillna("").astype(object),
+        df["annee"].astype("string").fillna("").astype(object),
+    ]
 
-date_cols = ["date_naissance","date_embauche","stage_debut","stage_fin"]
-for c in date_cols:
-    if c in clean.columns:
-        clean[c] = pd.to_datetime(clean[c], errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
+@profiling.profiled
+def person_year_key(df):
+    """Clé Personne × Année en int64, dans le même ordre que la clé texte "|".join(...).
+
+    Chaque composante est remplacée par son rang (factorize triée, suffixée de "|"
+    pour respecter l'ordre de la chaîne jointe), puis les rangs sont combinés en base
+    mixte : pas de collision, et trier la clé int64 = trier la clé texte.
+    Repli sur la clé texte (construite par colonnes) si un nom contient "|" ou si le
+    produit des cardinalités dépasse int64.
+    """
+    parts = person_year_key_parts(df)
+    if parts[0].str.contains("|", regex=False).any() or parts[1].str.contains("|", regex=False).any():
+        return parts[0] + "|" + parts[1] + "|" + parts[2] + "|" + parts[3]
+    key, radix = np.zeros(len(df), dtype=np.int64), 1
+    for i, p in enumerate(parts):
+        codes, uniques = pd.factorize(p + "|" if i < len(parts) - 1 else p, sort=True)
+        radix *= max(len(uniques), 1)
+        if radix >= 2**63:
+            return parts[0] + "|" + parts[1] + "|" + parts[2] + "|" + parts[3]
+        key = key * max(len(uniques), 1) + codes
+    return pd.Series(key, index=df.index)
+
+# Réductions par groupe (codes 0..n-1 triés) équivalentes aux agrégats Python
+def _as_text(s):
+    vals = s.astype(object)
+    vals = vals[vals.notna()]
+    is_str = _type_mask(vals, str)
+    return vals if is_str.all() else vals.where(is_str, vals.astype(str))
+
+def agg_bool_by_group(codes, ngroups, s):
+    b = s.astype("boolean")
+    seen = np.bincount(codes[b.notna().to_numpy()], minlength=ngroups) > 0
+    true = np.bincount(codes[b.fillna(False).to_numpy(bool)], minlength=ngroups) > 0
+    out = np.full(ngroups, None, dtype=object)
+    out[seen] = true[seen].tolist()
+    return out
+
+def agg_text_longest_by_group(codes, ngroups, s):
+    txt = _as_text(s)
+    txt = txt[txt.str.strip() != ""]
+    out = np.full(ngroups, None, dtype=object)
+    if len(txt):
+        g = codes[s.index.get_indexer(txt.index)]
+        # idxmax = 1re occurrence de la longueur max, comme max(vals, key=len)
+        best = pd.Series(txt.str.len().to_numpy()).groupby(g).idxmax()
+        out[best.index] = txt.to_numpy()[best.to_numpy()]
+    return out
+
+def agg_list_unique_by_group(codes, ngroups, s, sep="; "):
+    txt = _as_text(s).str.strip()
+    txt = txt[txt != ""]
+    out = np.full(ngroups, None, dtype=object)
+    if len(txt):
+        pairs = pd.DataFrame({"g": codes[s.index.get_indexer(txt.index)], "v": txt.to_numpy()})
+        pairs = pairs.drop_duplicates().sort_values(["g", "v"])
+        g, v = pairs["g"].to_numpy(), pairs["v"].to_numpy()
+        starts = np.r_[0, np.flatnonzero(np.diff(g)) + 1]
+        ends = np.r_[starts[1:], len(g)]
+        out[g[starts]] = [sep.join(v[a:b]) for a, b in zip(starts, ends)]
+    return out
+
+# Colonnes de agg_dict_year dont l'agrégat Python a un équivalent vectorisé
+GROUP_REDUCERS = {
+    "matiere": lambda c, n, s: agg_list_unique_by_group(c, n, s, "; "),
+    "description_projet": agg_text_longest_by_group,
+    "publie": agg_bool_by_group,
+}
+
+@profiling.profiled
+def aggregate_person_year(df, engine=ENGINE):
+    if engine == "apply":
+        df["_key_year"] = person_year_key_str(df)
+        return df.groupby("_key_year", dropna=False).agg(agg_dict_year).reset_index(drop=True)
+
+    df["_key_year"] = person_year_key(df)
+    codes, uniques = pd.factorize(df["_key_year"], sort=True)
+    ngroups = len(uniques)
+    native = {c: how for c, how in agg_dict_year.items() if c not in GROUP_REDUCERS}
+    clean = df.groupby(codes, sort=True).agg(native).reset_index(drop=True)
+    for c in GROUP_REDUCERS:
+        if c in agg_dict_year:
+            clean[c] = GROUP_REDUCERS[c](codes, ngroups, df[c])
+    return clean[list(agg_dict_year)]
+
+def apply_fuzzy(df, threshold=None):
+    """Dédup approchée (fuzzy_dedup) sur les lignes nettoyées, avant aggregate_person_year."""
+    import fuzzy_dedup
+    df, stats = fuzzy_dedup.fuzzy_dedup(df, fuzzy_dedup.THRESHOLD if threshold is None else threshold)
+    fuzzy_dedup.print_stats(stats)
+    return df
+
+# ========= Post-traitements =========
+@profiling.profiled
+def finalize(clean):
+    if "publie" in clean.columns:
+        clean["publie"] = clean["publie"].map({True: "True", False: "False"}).fillna("NULL")
+
+    for c in DATE_COLS:
+        if c in clean.columns:
+            clean[c] = pd.to_datetime(clean[c], errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
+    return clean
 
 # ========= Exports =========
-out_csv  = os.path.join(OUT_DIR, "source_bruit_1000_final_clean_annee.csv")
-out_xlsx = os.path.join(OUT_DIR, "source_bruit_1000_final_clean_annee.xlsx")
-report_json = os.path.join(OUT_DIR, "data_quality_report.json")
-
-clean.to_csv(out_csv, index=False, encoding="utf-8")
-with pd.ExcelWriter(out_xlsx, engine="xlsxwriter") as w:
-    clean.to_excel(w, index=False, sheet_name="clean_by_year")
-
-# Petit rapport de contrôle
-dq = {
-    "nb_lignes_sortie": len(clean),
-    "compte_publie": clean["publie"].value_counts(dropna=False).to_dict(),
-    "dates_vides": {c:int((clean[c] == "").sum()) for c in date_cols},
+CLEAN_BASENAME = "source_bruit_1000_final_clean_annee"
+CLEAN_CSV = CLEAN_BASENAME + ".csv"
+REPORT_JSON = "data_quality_report.json"
+XLSX_MAX_ROWS = 1_048_576              # limite Excel par feuille (en-tête compris)
+XLSX_SHEET = "clean_by_year"
+
+def quality_report(clean):
+    # Petit rapport de contrôle
+    return {
+        "nb_lignes_sortie": len(clean),
+        "compte_publie": clean["publie"].value_counts(dropna=False).to_dict(),
+        "dates_vides": {c:int((clean[c] == "").sum()) for c in DATE_COLS},
+    }
+
+def write_report(dq, out_dir=OUT_DIR):
+    report_json = os.path.join(out_dir, REPORT_JSON)
+    with open(report_json, "w", encoding="utf-8") as f:
+        json.dump(dq, f, ensure_ascii=False, indent=2)
+    return report_json
+
+# Chaque format est un "writer" qui reçoit le résultat par blocs (write) puis close() ;
+# le mode mémoire lui passe tout le DataFrame d'un coup, le mode --stream bloc par bloc.
+class _CsvWriter:
+    def __init__(self, path, compress=False):
+        self.f = gzip.open(path, "wt", encoding="utf-8", newline="") if compress \
+            else open(path, "w", encoding="utf-8", newline="")
+        self.header = True
+
+    def write(self, frame):
+        frame.to_csv(self.f, index=False, header=self.header)
+        self.header = False
+
+    def close(self):
+        self.f.close()
+
+class _ParquetWriter:
+    def __init__(self, path):
+        self.path, self.w = path, None
+
+    def write(self, frame):
+        import pyarrow as pa, pyarrow.parquet as pq
+        if self.w is None:   # après finalize() tout est texte sauf annee
+            self.schema = pa.schema([(c, pa.int64() if c == "annee" else pa.string()) for c in frame.columns])
+            self.w = pq.ParquetWriter(self.path, self.schema)
+        self.w.write_table(pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self.w is not None: self.w.close()
+
+class _XlsxWriter:
+    """xlsxwriter en mode constant_memory (ligne par ligne), nouvelle feuille à chaque limite Excel."""
+    def __init__(self, path):
+        import xlsxwriter
+        self.wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+        self.bold = self.wb.add_format({"bold": True, "border": 1, "align": "center"})
+        self.ws, self.row, self.sheets = None, XLSX_MAX_ROWS, 0
+
+    def write(self, frame):
+        rows = frame.astype(object).where(frame.notna(), None).to_numpy().tolist()
+        for values in rows:
+            if self.row >= XLSX_MAX_ROWS:
+                self.sheets += 1
+                self.ws = self.wb.add_worksheet(XLSX_SHEET if self.sheets == 1 else f"{XLSX_SHEET}_{self.sheets}")
+                self.ws.write_row(0, 0, list(frame.columns), self.bold)
+                self.row = 1
+            self.ws.write_row(self.row, 0, values)
+            self.row += 1
+        if self.ws is None and not len(frame):
+            self.ws, self.row, self.sheets = self.wb.add_worksheet(XLSX_SHEET), 1, 1
+            self.ws.write_row(0, 0, list(frame.columns), self.bold)
+
+    def close(self):
+        self.wb.close()
+
+OUTPUT_WRITERS = {
+    "csv": (".csv", _CsvWriter),
+    "csv.gz": (".csv.gz", lambda path: _CsvWriter(path, compress=True)),
+    "parquet": (".parquet", _ParquetWriter),
+    "xlsx": (".xlsx", _XlsxWriter),
 }
-with open(report_json, "w", encoding="utf-8") as f:
-    json.dump(dq, f, ensure_ascii=False, indent=2)
 
-print("Nettoyage terminés la team")
-print("→", out_csv)
-print("→", out_xlsx)
-print("→", report_json)
+def open_writers(formats, out_dir=OUT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    writers = {}
+    for fmt in formats:
+        ext, factory = OUTPUT_WRITERS[fmt]
+        path = os.path.join(out_dir, CLEAN_BASENAME + ext)
+        writers[fmt] = (path, factory(path))
+    return writers
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+def write_blocks(writers, frame, timings, pool):
+    """Écrit le même bloc dans tous les formats en parallèle (threads) et cumule les durées."""
+    futures = {fmt: pool.submit(_timed, w.write, frame) for fmt, (_, w) in writers.items()}
+    for fmt, fut in futures.items():
+        timings[fmt] = timings.get(fmt, 0.0) + fut.result()
+
+def close_writers(writers, timings):
+    for fmt, (_, w) in writers.items():
+        timings[fmt] = round(timings.get(fmt, 0.0) + _timed(w.close), 3)
+
+@profiling.profiled
+def write_outputs(clean, out_dir=OUT_DIR, formats=FORMATS, profile=None):
+    """profile : DQProfile du nettoyage, ajouté au rapport qualité (clé "profil")."""
+    writers, timings = open_writers(formats, out_dir), {}
+    with ThreadPoolExecutor(max(1, len(writers))) as pool:
+        write_blocks(writers, clean, timings, pool)
+    close_writers(writers, timings)
+    dq = {**quality_report(clean), "temps_ecriture_s": timings}
+    if profile is not None:
+        dq["profil"] = profile.to_dict()
+    return [path for path, _ in writers.values()] + [write_report(dq, out_dir)]
+
+# ========= Mode streaming (hors mémoire) =========
+# 1) lecture par blocs + nettoyage bloc par bloc
+# 2) répartition des lignes par hash de la clé Personne × Année dans des fichiers de débord
+# 3) agrégation partition par partition (mêmes règles agg_dict_year), sortie triée par clé
+# 4) fusion k-voies des partitions triées -> même CSV, dans le même ordre, que le mode mémoire
+# Une partition plus grosse que prévu est redécoupée (autre graine de hash) avant agrégation.
+
+BYTES_PER_ROW = 2_000      # estimation prudente d'une ligne nettoyée en mémoire (objets Python)
+AGG_OVERHEAD = 4           # l'agrégation d'une partition coûte ~4x sa taille sur disque
+DISK_TO_MEMORY = {".xlsx": 10, ".xlsm": 10, ".parquet": 8}   # facteur taille mémoire / taille fichier
+MAX_SPLIT_DEPTH = 4
+
+def _key_string(df):
+    parts = person_year_key_parts(df)
+    return parts[0] + "|" + parts[1] + "|" + parts[2] + "|" + parts[3]
+
+def _partition_ids(df, nparts, seed=0):
+    parts = pd.DataFrame(dict(enumerate(person_year_key_parts(df))))
+    h = pd.util.hash_pandas_object(parts, index=False, hash_key=f"{seed:016d}")
+    return (h.to_numpy() % np.uint64(nparts)).astype(np.int64)
+
+def _spill(df, nparts, paths, seed=0):
+    pid = _partition_ids(df, nparts, seed)
+    for p in np.unique(pid):
+        with open(paths[p], "ab") as f:
+            pickle.dump(df[pid == p], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _load_frames(path):
+    with open(path, "rb") as f:
+        while True:
+            try: yield pickle.load(f)
+            except EOFError: return
+
+def _aggregate_partition(path, budget, engine, chunk_rows, depth=0, profile=None):
+    """Agrège un fichier de débord ; renvoie la liste des fichiers triés produits."""
+    if not os.path.exists(path): return []
+    size = os.path.getsize(path)
+    if size * AGG_OVERHEAD > budget and depth < MAX_SPLIT_DEPTH:
+        nsub = math.ceil(size * AGG_OVERHEAD / budget)
+        subs = [f"{path}.{i}" for i in range(nsub)]
+        for frame in _load_frames(path):
+            _spill(frame, nsub, subs, seed=depth + 1)
+        os.remove(path)
+        return [run for sub in subs for run in _aggregate_partition(sub, budget, engine, chunk_rows, depth + 1, profile)]
+
+    df = pd.concat(list(_load_frames(path)), ignore_index=True)
+    os.remove(path)
+    clean = aggregate_person_year(df, engine=engine)
+    del df
+    if profile is not None:
+        profile.observe(clean)
+    clean["_key_year"] = _key_string(clean)   # groupes déjà triés dans l'ordre de la clé texte
+    clean = finalize(clean)
+    run = path + ".sorted"
+    with open(run, "wb") as f:
+        for start in range(0, len(clean), chunk_rows):
+            pickle.dump(clean.iloc[start:start + chunk_rows], f, protocol=pickle.HIGHEST_PROTOCOL)
+    return [run]
+
+def _iter_run(path):
+    for frame in _load_frames(path):
+        keys = frame.pop("_key_year").tolist()
+        yield from zip(keys, frame.itertuples(index=False, name=None))
+
+def _merge_runs(runs, writers, columns, chunk_rows):
+    """Fusion k-voies des partitions triées ; écrit les sorties par blocs et cumule le rapport."""
+    counts, empty, total, first = pd.Series(dtype="int64"), dict.fromkeys(DATE_COLS, 0), 0, True
+    timings = {}
+    merged = heapq.merge(*(_iter_run(r) for r in runs), key=lambda kv: kv[0])
+    with ThreadPoolExecutor(max(1, len(writers))) as pool:
+        while True:
+            block = [row for _, row in zip(range(chunk_rows), merged)]
+            if not block and not first: break
+            frame = pd.DataFrame([row for _, row in block], columns=columns)
+            write_blocks(writers, frame, timings, pool)
+            first = False
+            dq = quality_report(frame)
+            total += dq["nb_lignes_sortie"]
+            counts = counts.add(pd.Series(dq["compte_publie"], dtype="int64"), fill_value=0)
+            for c in DATE_COLS: empty[c] += dq["dates_vides"][c]
+            if not block: break
+    close_writers(writers, timings)
+    return {
+        "nb_lignes_sortie": total,
+        "compte_publie": counts.astype("int64").sort_values(ascending=False, kind="stable").to_dict(),
+        "dates_vides": empty,
+        "temps_ecriture_s": timings,
+    }
+
+@profiling.profiled
+def stream_clean(src, out_dir=OUT_DIR, engine=ENGINE, memory_budget_mb=MEMORY_BUDGET_MB,
+                 chunk_rows=None, spill_dir=None, cache_dir=CACHE_DIR, formats=FORMATS):
+    budget = memory_budget_mb * 1024 * 1024
+    chunk_rows = chunk_rows or max(1_000, budget // (AGG_OVERHEAD * BYTES_PER_ROW))
+    ext = os.path.splitext(src)[1].lower()
+    nparts = max(1, math.ceil(os.path.getsize(src) * DISK_TO_MEMORY.get(ext, 3) * AGG_OVERHEAD / budget))
+
+    with tempfile.TemporaryDirectory(prefix="etl_spill_", dir=spill_dir) as tmp:
+        paths = [os.path.join(tmp, f"part_{p:04d}.pkl") for p in range(nparts)]
+        nrows, profile = 0, DQProfile()   # un seul profil, complété bloc par bloc
+        for chunk in iter_source(src, chunk_rows, cache_dir):
+            nrows += len(chunk)
+            _spill(clean_rows(chunk, engine=engine, dq=profile), nparts, paths)
+        print(f"   {nrows} lignes lues, réparties en {nparts} partition(s) (blocs de {chunk_rows})")
+
+        runs = [run for p in paths for run in _aggregate_partition(p, budget, engine, chunk_rows, profile=profile)]
+        writers = open_writers(formats, out_dir)
+        dq = {**_merge_runs(runs, writers, list(agg_dict_year), chunk_rows), "profil": profile.to_dict()}
+    return [path for path, _ in writers.values()] + [write_report(dq, out_dir)]
+
+# ========= Mode parallèle (--workers N) =========
+# Phase 1 : chaque worker nettoie une tranche de lignes et la répartit par hash de la clé
+#           Personne × Année normalisée, en fichiers Arrow IPC (tmpfs /dev/shm si présent).
+# Phase 2 : chaque worker lit ses partitions par memory-map, agrège (agg_dict_year) et
+#           renvoie un fichier Arrow ; le processus principal trie sur la clé texte,
+#           d'où un ordre de sortie déterministe, identique au mode mono-cœur.
+# Le DataFrame brut n'est jamais sérialisé : les workers (fork) le partagent en copie à l'écriture.
+
+_SOURCE = None
+
+def _arrow_schema():
+    import pyarrow as pa
+    fields = [(c, pa.string()) for c in TEXT_COLS] + [(c, pa.timestamp("ns")) for c in DATE_COLS]
+    fields += [("annee", pa.int64()), ("publie", pa.bool_())]
+    types = dict(fields)
+    return pa.schema([(c, types[c]) for c in agg_dict_year])
+
+def _write_arrow(df, path, schema=None):
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as w:
+        w.write_table(table)
+    return path
+
+def _read_arrow(paths):
+    import pyarrow as pa
+    tables = [pa.ipc.open_file(pa.memory_map(p)).read_all() for p in paths]
+    return pa.concat_tables(tables).to_pandas()
+
+def _clean_slice(start, stop, nparts, engine, tmp):
+    profile = DQProfile()   # profil de la tranche, renvoyé au processus principal qui les fusionne
+    df = clean_rows(_SOURCE.iloc[start:stop].copy(), engine=engine, dq=profile)[list(agg_dict_year)]
+    pid = _partition_ids(df, nparts)
+    schema = _arrow_schema()
+    return {int(p): _write_arrow(df[pid == p], os.path.join(tmp, f"s{start:012d}_p{p:04d}.arrow"), schema)
+            for p in np.unique(pid)}, profile
+
+def _aggregate_slice_files(paths, engine, out):
+    clean = aggregate_person_year(_read_arrow(paths), engine=engine)
+    profile = DQProfile()
+    profile.observe(clean)
+    clean["_key_year"] = _key_string(clean)
+    return _write_arrow(finalize(clean), out), profile
+
+@profiling.profiled
+def parallel_clean(df, workers, engine=ENGINE, slices_per_worker=4, dq=None):
+    """dq (DQProfile) : reçoit la fusion des profils des workers."""
+    global _SOURCE
+    dq = DQProfile() if dq is None else dq
+    if "fork" not in mp.get_all_start_methods():
+        raise SystemExit("--workers nécessite le démarrage des processus par fork (Linux/macOS).")
+    _SOURCE = df
+    nparts = workers * slices_per_worker
+    bounds = np.linspace(0, len(df), nparts + 1).astype(int)
+    shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    try:
+        with tempfile.TemporaryDirectory(prefix="etl_par_", dir=shm) as tmp, \
+             ProcessPoolExecutor(workers, mp_context=mp.get_context("fork")) as pool:
+            futures = [pool.submit(_clean_slice, a, b, nparts, engine, tmp)
+                       for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+            by_part = {}
+            for fut in futures:   # ordre des tranches = ordre des lignes source
+                parts, profile = fut.result()
+                dq.merge(profile)
+                for p, path in parts.items():
+                    by_part.setdefault(p, []).append(path)
+            outs = [pool.submit(_aggregate_slice_files, by_part[p], engine, os.path.join(tmp, f"agg_{p:04d}.arrow"))
+                    for p in sorted(by_part)]
+            paths = []
+            for fut in outs:
+                path, profile = fut.result()
+                dq.merge(profile)
+                paths.append(path)
+            clean = _read_arrow(paths) if paths else None   # source sans ligne : aucune partition écrite
+    finally:
+        _SOURCE = None
+    if clean is None:
+        return finalize(aggregate_person_year(clean_rows(df.iloc[:0].copy(), engine=engine), engine=engine))
+    clean = clean.sort_values("_key_year", kind="stable", ignore_index=True)
+    return clean.drop(columns="_key_year")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nettoyage & dédup Personne × Année")
+    ap.add_argument("src", nargs="?", default=SRC, help="fichier source .xlsx, .csv ou .parquet")
+    ap.add_argument("--out-dir", default=OUT_DIR)
+    ap.add_argument("--engine", choices=sorted(CLEANERS), default=ENGINE,
+                    help="vectorized (défaut) ou apply (implémentation cellule par cellule)")
+    ap.add_argument("--formats", nargs="+", choices=sorted(OUTPUT_WRITERS), default=FORMATS,
+                    help="formats de sortie écrits en parallèle (défaut : csv)")
+    ap.add_argument("--stream", action="store_true",
+                    help="lecture par blocs + partitions sur disque (mémoire bornée)")
+    ap.add_argument("--memory-budget", type=int, default=MEMORY_BUDGET_MB, metavar="MB")
+    ap.add_argument("--chunk-rows", type=int, help="taille des blocs (défaut : déduite du budget)")
+    ap.add_argument("--spill-dir", help="dossier des fichiers de débord (défaut : dossier temporaire)")
+    ap.add_argument("--cache-dir", default=CACHE_DIR, help="cache d'ingestion des classeurs xlsx")
+    ap.add_argument("--no-cache", action="store_true", help="toujours relire le classeur source")
+    ap.add_argument("--workers", type=int, default=1, metavar="N",
+                    help="nettoyage + agrégation sur N processus (partition par clé Personne × Année)")
+    ap.add_argument("--fuzzy", action="store_true",
+                    help="dédup approchée des élèves (fautes de frappe, nom / prénom inversés) avant l'agrégation")
+    ap.add_argument("--fuzzy-threshold", type=float, metavar="SEUIL",
+                    help="avec --fuzzy : similarité minimale (Dice sur les bigrammes, défaut 0.8)")
+    profiling.add_arguments(ap)
+    args = ap.parse_args(argv)
+    if args.fuzzy and (args.stream or args.workers > 1):
+        ap.error("--fuzzy compare tous les élèves entre eux : mode en mémoire seulement (pas --stream / --workers)")
+    cache_dir = None if args.no_cache else args.cache_dir
+
+    with profiling.run_report(args, "etl_bi_clean"):
+        if args.stream:
+            outputs = stream_clean(args.src, args.out_dir, args.engine, args.memory_budget,
+                                   args.chunk_rows, args.spill_dir, cache_dir, args.formats)
+        elif args.workers > 1:
+            dq = DQProfile()
+            clean = parallel_clean(read_source(args.src, cache_dir), args.workers, engine=args.engine, dq=dq)
+            outputs = write_outputs(clean, args.out_dir, args.formats, dq)
+        else:
+            dq = DQProfile()
+            df = clean_rows(read_source(args.src, cache_dir), engine=args.engine, dq=dq)
+            if args.fuzzy:
+                df = apply_fuzzy(df, args.fuzzy_threshold)
+            agg = aggregate_person_year(df, engine=args.engine)
+            dq.observe(agg)
+            clean = finalize(agg)
+            outputs = write_outputs(clean, args.out_dir, args.formats, dq)
+
+    print("Nettoyage terminés la team")
+    for path in outputs:
+        print("→", path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# fuzzy_dedup.py
+# Dédoublonnage approché des élèves (etl_bi_clean --fuzzy), avant l'agrégation Personne × Année.
+#
+# La dédup exacte ne fusionne que les clés nom|prenom|date_naissance|annee identiques (sans
+# accents ni casse) : "Dupond" / "Dupont", ou nom et prénom inversés, restent deux élèves.
+# Ici on compare les élèves distincts (nom, prénom, date de naissance) sans tout comparer
+# à tout (O(n²)) :
+#   - blocage : index inversé (date de naissance, bigramme) -> élèves ; les bigrammes sont
+#     ceux des mots du nom ET du prénom mélangés ("#dupont#", "#jean#"), donc une inversion
+#     nom / prénom garde les mêmes clés ; seules les paires partageant une clé sont candidates
+#     (clés trop fréquentes ignorées : MAX_BLOCK)
+#   - score vectorisé : le nombre de bigrammes communs sort directement de l'index (une
+#     occurrence par clé partagée), Dice = 2 × communs / (|A| + |B|) en numpy sur toutes les paires
+#   - paires au-dessus du seuil -> composantes connexes ; chaque groupe prend l'orthographe
+#     (nom, prénom) la plus fréquente, la dédup exacte fait le reste
+# Les élèves sans date de naissance ne sont pas comparés (pas de bloc sûr).
+import time
+import numpy as np
+import pandas as pd
+import profiling
+from etl_bi_clean import strip_accents_lower_vec
+
+THRESHOLD = 0.8      # Dice minimal sur les bigrammes nom + prénom
+QGRAM = 2
+MAX_BLOCK = 1000     # clé (date, bigramme) partagée par plus d'élèves : ignorée
+
+def _grams(word, q=QGRAM):
+    w = f"#{word}#"
+    return {w[i:i + q] for i in range(len(w) - q + 1)}
+
+def _name_grams(names, vocab):
+    """Identifiants de bigrammes de chaque nom normalisé distinct (une liste par nom)."""
+    out = []
+    for name in names:
+        grams = set().union(*(_grams(w) for w in name.replace("-", " ").split())) if name else set()
+        out.append([vocab.setdefault(g, len(vocab)) for g in sorted(grams)])
+    return out
+
+def _postings(nom_codes, prenom_codes, name_grams, ngrams):
+    """(élève, bigramme) sans doublon, pour les bigrammes du nom et du prénom réunis."""
+    lens = np.array([len(g) for g in name_grams], dtype=np.int64)
+    flat = np.fromiter((g for gs in name_grams for g in gs), dtype=np.int64, count=int(lens.sum()))
+    starts = np.r_[0, np.cumsum(lens)[:-1]]
+    person, gram = [], []
+    for codes in (nom_codes, prenom_codes):
+        n = lens[codes]
+        p = np.repeat(np.arange(len(codes)), n)
+        gram.append(flat[np.repeat(starts[codes], n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)])
+        person.append(p)
+    code = pd.unique(np.concatenate(person) * ngrams + np.concatenate(gram))
+    return code // ngrams, code % ngrams
+
+def _factorize_names(nom, prenom):
+    """Noms et prénoms normalisés distincts (vocabulaire commun) et code de chaque valeur
+    (noms puis prénoms, bout à bout)."""
+    codes, names = pd.factorize(np.concatenate([nom.to_numpy(dtype=object), prenom.to_numpy(dtype=object)]))
+    return names, codes
+
+def _pairs_in_groups(order, starts, sizes):
+    """Toutes les paires (i < j) à l'intérieur de chaque groupe (positions dans `order`)."""
+    pos = np.repeat(starts, sizes) + np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    later = np.repeat(starts + sizes, sizes) - pos - 1              # éléments après pos dans son groupe
+    left = np.repeat(pos, later)
+    right = left + 1 + np.arange(later.sum()) - np.repeat(np.cumsum(later) - later, later)
+    return order[left], order[right]
+
+def _components(n, a, b):
+    """Étiquette (plus petit indice) de la composante connexe de chaque nœud."""
+    label = np.arange(n)
+    while True:
+        m = np.minimum(label[a], label[b])
+        new = label.copy()
+        np.minimum.at(new, a, m)
+        np.minimum.at(new, b, m)
+        new = new[new]
+        if np.array_equal(new, label):
+            return label
+        label = new
+
+def _pair_count(sizes):
+    sizes = np.asarray(sizes, dtype=np.float64)
+    return int((sizes * (sizes - 1) / 2).sum())
+
+@profiling.profiled
+def fuzzy_dedup(df, threshold=THRESHOLD, max_block=MAX_BLOCK):
+    """Réécrit nom / prénom des variantes approchées d'un même élève (sur place) ; retourne
+    (df, statistiques du blocage et des appariements)."""
+    t0 = time.perf_counter()
+    # élève = (nom, prénom, date) comme dans la clé exacte (person_year_key_parts), en codes
+    names, name_codes = _factorize_names(strip_accents_lower_vec(df["nom"]), strip_accents_lower_vec(df["prenom"]))
+    naiss_codes, _ = pd.factorize(pd.to_datetime(df["date_naissance"]).to_numpy())   # NaT -> -1
+    nom_codes, prenom_codes = name_codes[:len(df)], name_codes[len(df):]
+    nn = max(len(names), 1)
+    person_codes, persons = pd.factorize((naiss_codes.astype(np.int64) * nn + nom_codes) * nn + prenom_codes)
+    # factorize numérote dans l'ordre d'apparition : 1re ligne de l'élève k = 1re fois où le code atteint k
+    first_row = np.flatnonzero(person_codes > np.r_[-1, np.maximum.accumulate(person_codes)[:-1]])
+    n = len(persons)
+    stats = {"eleves": n, "seuil": threshold}
+    if n == 0:   # source vide : rien à comparer
+        stats.update(dict.fromkeys(["eleves_dates", "paires_naives", "paires_bloc_date", "paires_candidates",
+                                    "cles_ignorees", "paires_appariees", "eleves_fusionnes", "lignes_reecrites"], 0),
+                     reduction=None, paires_par_s=None, secondes=round(time.perf_counter() - t0, 3))
+        return df, stats
+
+    vocab = {}
+    name_grams = _name_grams(names, vocab)
+    person, gram = _postings(nom_codes[first_row], prenom_codes[first_row], name_grams, max(len(vocab), 1))
+    gram_count = np.bincount(person, minlength=n)
+
+    # index inversé (date, bigramme) -> élèves, hors élèves sans date de naissance
+    t_pairs = time.perf_counter()
+    p_naiss = naiss_codes[first_row]
+    dated = p_naiss >= 0
+    keep = dated[person]
+    person, gram = person[keep], gram[keep]
+    key = p_naiss[person].astype(np.int64) * max(len(vocab), 1) + gram
+    order = np.argsort(key, kind="stable")
+    _, starts, sizes = np.unique(key[order], return_index=True, return_counts=True)
+    big = sizes > max_block
+    usable = (sizes > 1) & ~big
+    a, b = _pairs_in_groups(order, starts[usable], sizes[usable])
+    a, b = person[a], person[b]
+
+    # une paire apparaît une fois par clé partagée : le compte = bigrammes communs
+    n_dated = int(dated.sum())
+    pair_code, shared = np.unique(np.minimum(a, b) * n + np.maximum(a, b), return_counts=True)
+    a, b = pair_code // n, pair_code % n
+    dice = 2 * shared / (gram_count[a] + gram_count[b])
+    match = dice >= threshold
+    elapsed = time.perf_counter() - t_pairs
+
+    stats.update({
+        "eleves_dates": n_dated,
+        "paires_naives": _pair_count([n_dated]),
+        "paires_bloc_date": _pair_count(np.bincount(p_naiss[dated])),
+        "paires_candidates": len(pair_code),
+        "cles_ignorees": int(big.sum()),
+        "paires_appariees": int(match.sum()),
+    })
+    stats["reduction"] = round(1 - stats["paires_candidates"] / stats["paires_naives"], 6) if stats["paires_naives"] else None
+    stats["paires_par_s"] = round(len(pair_code) / elapsed) if elapsed else None
+
+    # orthographe retenue par groupe : la plus fréquente en lignes (puis la première rencontrée)
+    label = _components(n, a[match], b[match])
+    rows = np.bincount(person_codes, minlength=n)
+    rank = np.lexsort((np.arange(n), -rows, label))
+    canon = np.empty(n, dtype=np.int64)
+    first = np.r_[True, label[rank][1:] != label[rank][:-1]]
+    canon[rank] = rank[first][np.cumsum(first) - 1]
+    moved = canon[person_codes] != person_codes
+    if moved.any():
+        # valeurs (nettoyées) de la première ligne de l'élève retenu
+        src = first_row[canon[person_codes[moved]]]
+        for c in ("nom", "prenom"):
+            vals = df[c].to_numpy(dtype=object, copy=True)
+            vals[moved] = vals[src]
+            df[c] = vals
+    stats["eleves_fusionnes"] = int((canon != np.arange(n)).sum())
+    stats["lignes_reecrites"] = int(moved.sum())
+    stats["secondes"] = round(time.perf_counter() - t0, 3)
+    profiling.note(**{k: v for k, v in stats.items() if k != "seuil"})
+    return df, stats
+
+def print_stats(stats):
+    avoided = f"{stats['reduction']:.4%}" if stats["reduction"] is not None else "-"
+    ignored = f", {stats['cles_ignorees']} clé(s) trop fréquente(s) ignorée(s)" if stats["cles_ignorees"] else ""
+    print(f"🔎 Dédup approchée (seuil {stats['seuil']}) : {stats['paires_candidates']:,} paires candidates "
+          f"sur {stats['paires_naives']:,} ({avoided} évitées ; bloc date seul : "
+          f"{stats['paires_bloc_date']:,}), {stats['paires_par_s'] or 0:,} paires/s")
+    print(f"   {stats['paires_appariees']:,} paire(s) appariée(s), {stats['eleves_fusionnes']:,} élève(s) "
+          f"fusionné(s), {stats['lignes_reecrites']:,} ligne(s) réécrite(s){ignored}")
@@ -0,0 +1,160 @@
+# ingest_cache.py
+# Cache des fichiers source déjà lus (pd.read_excel via openpyxl est l'étape la plus lente).
+#
+# Clé : chemin + taille + mtime -> hash SHA-256 du contenu (recalculé seulement si le
+# fichier a bougé). La feuille lue est stockée une fois en Arrow IPC (types conservés via
+# les métadonnées pandas) et relue ensuite par memory-map ; si pyarrow ne sait pas
+# représenter une colonne (objets de types mélangés), repli sur un pickle.
+# Une entrée illisible, ou dont la taille ou le hash SHA-256 ne sont plus ceux de son écriture
+# (fichier tronqué, corrompu), est supprimée et la source est relue. Le hash n'est recalculé
+# que si la taille ou le mtime du fichier en cache ont changé depuis ; sinon la vérification
+# du pied de fichier Arrow à l'ouverture suffit.
+# La taille totale du cache est plafonnée, éviction LRU sur la date de dernière lecture.
+import os, json, time, hashlib, pickle
+import pandas as pd
+
+CACHE_DIR = os.path.join(".cache", "ingest")
+CACHE_MAX_MB = 2048
+CACHE_VERSION = 2    # 2 : hash du fichier en cache dans l'index
+INDEX = "index.json"
+
+def _load_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, INDEX), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"entries": {}, "stats": {}}
+
+def _save_index(cache_dir, index):
+    tmp = os.path.join(cache_dir, INDEX + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(cache_dir, INDEX))
+
+def file_sha256(path, bufsize=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(bufsize):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _stat_key(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+def _entry_key(path, index, variant):
+    """Clé d'entrée = hash du contenu + version du lecteur ; le hash est mémorisé par (chemin, taille, mtime)."""
+    stat_key = _stat_key(path)
+    digest = index["stats"].get(stat_key)
+    if digest is None:
+        digest = file_sha256(path)
+        index["stats"] = {k: v for k, v in index["stats"].items() if not k.startswith(os.path.abspath(path) + "|")}
+        index["stats"][stat_key] = digest
+    tag = hashlib.sha1(f"{CACHE_VERSION}|{pd.__version__}|{variant}".encode()).hexdigest()[:8]
+    return f"{digest}-{tag}"
+
+def _drop(cache_dir, index, key):
+    entry = index["entries"].pop(key, None)
+    if entry:
+        try: os.remove(os.path.join(cache_dir, entry["file"]))
+        except OSError: pass
+
+def _intact(path, entry):
+    """Fichier en cache présent, de la taille et du contenu écrits (hash relu seulement si le mtime a bougé)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if st.st_size != entry["bytes"]:
+        return False
+    if st.st_mtime_ns == entry.get("mtime_ns"):
+        return True
+    if file_sha256(path) != entry.get("sha256"):
+        return False
+    entry["mtime_ns"] = st.st_mtime_ns   # contenu inchangé : nouveau mtime mémorisé
+    return True
+
+def _read_entry(cache_dir, entry):
+    path = os.path.join(cache_dir, entry["file"])
+    if not _intact(path, entry):
+        raise ValueError("contenu inattendu")
+    if entry["format"] == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_file(pa.memory_map(path)).read_pandas()
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def _write_entry(cache_dir, key, df):
+    try:
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        name, fmt = key + ".arrow", "arrow"
+        with pa.OSFile(os.path.join(cache_dir, name + ".tmp"), "wb") as sink, \
+             pa.ipc.new_file(sink, table.schema) as w:
+            w.write_table(table)
+    except Exception:   # pyarrow absent ou colonne object non typable -> pickle
+        name, fmt = key + ".pkl", "pickle"
+        with open(os.path.join(cache_dir, name + ".tmp"), "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    full = os.path.join(cache_dir, name)
+    os.replace(full + ".tmp", full)
+    st = os.stat(full)
+    return {"file": name, "format": fmt, "bytes": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "sha256": file_sha256(full)}
+
+def _evict(cache_dir, index, max_bytes, keep):
+    total = sum(e["bytes"] for e in index["entries"].values())
+    for key, entry in sorted(index["entries"].items(), key=lambda kv: kv[1]["last_used"]):
+        if total <= max_bytes: break
+        if key == keep: continue
+        total -= entry["bytes"]
+        _drop(cache_dir, index, key)
+
+def cached_read(path, reader, variant="", cache_dir=CACHE_DIR, max_mb=CACHE_MAX_MB):
+    """Renvoie reader(path), en le servant depuis le cache si le fichier n'a pas changé."""
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _load_index(cache_dir)
+    key = _entry_key(path, index, variant)
+    entry = index["entries"].get(key)
+    df = None
+    if entry:
+        try:
+            df = _read_entry(cache_dir, entry)
+            print(f"   cache d'ingestion : {os.path.basename(path)} lu depuis {entry['file']}")
+        except Exception:
+            print(f"   cache d'ingestion : entrée {entry['file']} invalide, relecture de la source")
+            _drop(cache_dir, index, key)
+            entry = None
+    if df is None:
+        df = reader(path)
+        entry = {**_write_entry(cache_dir, key, df), "source": os.path.abspath(path)}
+        index["entries"][key] = entry
+    entry["last_used"] = time.time()
+    _evict(cache_dir, index, max_mb * 1024 * 1024, keep=key)
+    _save_index(cache_dir, index)
+    return df
+
+def cached_frame_path(path, variant="", cache_dir=CACHE_DIR):
+    """Chemin du fichier Arrow en cache pour `path`, s'il existe et est à jour (sinon None)."""
+    index = _load_index(cache_dir)
+    if not index["entries"]:
+        return None
+    changed = _stat_key(path) not in index["stats"]   # hash recalculé : mémorisé pour les appels suivants
+    key = _entry_key(path, index, variant)
+    entry = index["entries"].get(key)
+    full = None
+    if entry and entry["format"] == "arrow":
+        import pyarrow as pa
+        full, mtime = os.path.join(cache_dir, entry["file"]), entry.get("mtime_ns")
+        try:
+            if not _intact(full, entry):
+                raise ValueError("contenu inattendu")
+            pa.ipc.open_file(pa.memory_map(full))   # pied de fichier Arrow (troncature)
+            changed = changed or entry["mtime_ns"] != mtime
+        except Exception:
+            print(f"   cache d'ingestion : entrée {entry['file']} invalide, relecture de la source")
+            _drop(cache_dir, index, key)
+            full, changed = None, True
+    if changed:
+        _save_index(cache_dir, index)
+    return full
@@ -0,0 +1,207 @@
+# pipeline.py
+# Chaîne complète dans un seul processus : nettoyage -> ODS -> DWH -> export.
+#
+#   python -m pipeline run [source.xlsx] [--incremental] [--skip export] [--from dwh] [--resume]
+#   python -m pipeline status
+#
+# Le DataFrame nettoyé passe directement au chargement COPY de l'ODS (pas de relecture du CSV ;
+# le CSV nettoyé est toujours écrit, sauf --clean-formats sans valeur, et sert à reprendre plus
+# tard depuis l'étape ods). Un seul pool de connexions sert à l'ODS, au DWH et à l'export.
+# Chaque étape rapporte durée, lignes et pic de mémoire (RSS) ; l'état de la dernière exécution
+# est gardé dans STATE_FILE : --resume reprend à la première étape non terminée.
+# --profile : rapport détaillé (profiling) sous chaque étape, jusqu'aux requêtes SQL avec --explain.
+import os, json, time, argparse
+import profiling
+from profiling import reset_peak_rss, peak_rss_mb
+
+STAGES = ["clean", "ods", "dwh", "export"]
+STATE_FILE = ".pipeline_state.json"
+
+# ========= État =========
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_state(state, path=STATE_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp, path)
+
+# ========= Étapes =========
+# Chaque étape reçoit (ctx, args) et retourne le nombre de lignes produites ; ctx porte le
+# pool partagé et le DataFrame nettoyé.
+def stage_clean(ctx, args):
+    import etl_bi_clean as clean_mod
+    from dq_profile import DQProfile
+    cache_dir = None if args.no_cache else clean_mod.CACHE_DIR
+    df = clean_mod.read_source(args.src, cache_dir)
+    dq = DQProfile()
+    if args.workers > 1:
+        clean = clean_mod.parallel_clean(df, args.workers, engine=args.engine, dq=dq)
+    else:
+        rows = clean_mod.clean_rows(df, engine=args.engine, dq=dq)
+        if args.fuzzy:
+            rows = clean_mod.apply_fuzzy(rows, args.fuzzy_threshold)
+        agg = clean_mod.aggregate_person_year(rows, engine=args.engine)
+        dq.observe(agg)
+        clean = clean_mod.finalize(agg)
+        del rows, agg
+    del df
+    for path in clean_mod.write_outputs(clean, args.clean_dir, args.clean_formats, dq):
+        print("→", path)
+    ctx["clean"] = clean
+    return len(clean)
+
+def stage_ods(ctx, args):
+    import etl_to_ods
+    source = ctx.get("clean")
+    if source is None:   # reprise : nettoyage fait par une exécution précédente
+        import etl_bi_clean
+        source = os.path.join(args.clean_dir, etl_bi_clean.CLEAN_CSV)
+        if not os.path.exists(source):
+            raise SystemExit(f"❌ {source} introuvable : relancer l'étape clean (avec --clean-formats csv)")
+        print(f"   source : {source}")
+    with ctx["pool"].connection() as conn:
+        counts = etl_to_ods.load(conn, source, args.loader, incremental=args.incremental)
+    ctx.pop("clean", None)   # plus utilisé : libère la mémoire avant le DWH
+    return counts["rows_in_file"]
+
+def stage_dwh(ctx, args):
+    import build_dwh
+    counts = build_dwh.build(incremental=args.incremental, jobs=args.jobs, pool=ctx["pool"])
+    return counts["fait_annee"]
+
+def stage_export(ctx, args):
+    import export_dwh_to_csv
+    datasets = export_dwh_to_csv.export(args.out_dir, args.format, jobs=args.jobs, pool=ctx["pool"])
+    return sum(d["rows"] for d in datasets.values())
+
+RUNNERS = {"clean": stage_clean, "ods": stage_ods, "dwh": stage_dwh, "export": stage_export}
+
+def selected_stages(args, previous):
+    """Étapes à exécuter, dans l'ordre : --from / --to / --skip, ou --resume (première étape
+    non terminée de l'exécution précédente jusqu'à la fin)."""
+    stages = STAGES[STAGES.index(args.from_stage):STAGES.index(args.to_stage) + 1]
+    if args.resume:
+        done = {n for n, s in (previous or {}).get("stages", {}).items() if s.get("status") == "ok"}
+        while stages and stages[0] in done:
+            stages.pop(0)
+    return [s for s in stages if s not in args.skip]
+
+def print_report(state):
+    rows = [(n, s) for n, s in state["stages"].items()]
+    if not rows:
+        return
+    print("📊 Étapes :")
+    print(f"   {'étape':<8} {'statut':<8} {'durée':>9} {'lignes':>12} {'pic RSS':>10}")
+    for name, s in rows:
+        wall = f"{s['wall_s']:.2f}s" if s.get("wall_s") is not None else "-"
+        nrows = f"{s['rows']:,}" if s.get("rows") is not None else "-"
+        rss = f"{s['peak_rss_mb']:.0f} Mo" if s.get("peak_rss_mb") is not None else "-"
+        print(f"   {name:<8} {s['status']:<8} {wall:>9} {nrows:>12} {rss:>10}")
+
+def run(args):
+    from db import open_pool
+    previous = load_state(args.state)
+    stages = selected_stages(args, previous)
+    state = {"started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "src": args.src, "incremental": args.incremental,
+             "stages": {}}
+    if args.resume and previous:   # les étapes terminées restent dans l'état (reprise suivante)
+        state["stages"] = {n: s for n, s in previous.get("stages", {}).items()
+                           if s.get("status") == "ok" and n not in stages}
+    if not stages:
+        print("✅ Rien à exécuter.")
+        return state
+
+    t0 = time.perf_counter()
+    ctx = {}
+    needs_db = any(s != "clean" for s in stages)
+    # export : une connexion garde l'instantané, jobs pour les tables
+    ctx["pool"] = open_pool(args.jobs + 1) if needs_db else None
+    try:
+        for name in STAGES:
+            if name not in stages:
+                if name not in state["stages"]:
+                    state["stages"][name] = {"status": "skipped"}
+                continue
+            print(f"\n▶️  {name}")
+            reset_ok = reset_peak_rss()
+            start = time.perf_counter()
+            state["stages"][name] = {"status": "running"}
+            save_state(state, args.state)
+            try:
+                with profiling.span(name) as rec:
+                    nrows = rec["rows_out"] = RUNNERS[name](ctx, args)
+            except BaseException:
+                state["stages"][name] = {"status": "failed", "wall_s": round(time.perf_counter() - start, 3),
+                                         "peak_rss_mb": peak_rss_mb(reset_ok)}
+                save_state(state, args.state)
+                print_report(state)
+                raise
+            state["stages"][name] = {"status": "ok", "wall_s": round(time.perf_counter() - start, 3), "rows": nrows,
+                                     "peak_rss_mb": peak_rss_mb(reset_ok),
+                                     "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+            save_state(state, args.state)
+    finally:
+        if ctx.get("pool") is not None:
+            ctx["pool"].close()
+    state["wall_s"] = round(time.perf_counter() - t0, 3)
+    save_state(state, args.state)
+    print()
+    print_report(state)
+    print(f"🎉 Pipeline terminé en {state['wall_s']:.2f}s → état : {args.state}")
+    return state
+
+def main(argv=None):
+    import etl_bi_clean, etl_to_ods, build_dwh, export_dwh_to_csv
+    ap = argparse.ArgumentParser(prog="python -m pipeline", description="Nettoyage -> ODS -> DWH -> export")
+    sub = ap.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("run", help="exécute la chaîne (ou une partie)")
+    r.add_argument("src", nargs="?", default=etl_bi_clean.SRC, help="fichier source .xlsx, .csv ou .parquet")
+    r.add_argument("--incremental", action="store_true",
+                   help="ODS en delta puis DWH incrémental (au lieu de rechargement + reconstruction)")
+    r.add_argument("--from", dest="from_stage", choices=STAGES, default=STAGES[0], help="première étape")
+    r.add_argument("--to", dest="to_stage", choices=STAGES, default=STAGES[-1], help="dernière étape")
+    r.add_argument("--skip", nargs="+", choices=STAGES, default=[], help="étapes sautées")
+    r.add_argument("--resume", action="store_true",
+                   help="reprend à la première étape non terminée de l'exécution précédente")
+    r.add_argument("--state", default=STATE_FILE, help="fichier d'état / rapport JSON")
+    r.add_argument("--jobs", type=int, default=build_dwh.JOBS, help="connexions simultanées (DWH, export)")
+    # nettoyage
+    r.add_argument("--clean-dir", default=etl_bi_clean.OUT_DIR)
+    r.add_argument("--clean-formats", nargs="*", choices=sorted(etl_bi_clean.OUTPUT_WRITERS),
+                   default=etl_bi_clean.FORMATS, help="sorties du nettoyage (sans valeur : aucune)")
+    r.add_argument("--engine", choices=sorted(etl_bi_clean.CLEANERS), default=etl_bi_clean.ENGINE)
+    r.add_argument("--workers", type=int, default=1, metavar="N")
+    r.add_argument("--no-cache", action="store_true", help="toujours relire le classeur source")
+    r.add_argument("--fuzzy", action="store_true", help="dédup approchée des élèves (etl_bi_clean --fuzzy)")
+    r.add_argument("--fuzzy-threshold", type=float, metavar="SEUIL")
+    # ODS / export
+    r.add_argument("--loader", choices=sorted(etl_to_ods.LOADERS), default=etl_to_ods.LOADER)
+    r.add_argument("--out-dir", default=export_dwh_to_csv.OUT_DIR, help="dossier de l'export")
+    r.add_argument("--format", choices=["csv", "parquet"], default="csv", help="format de l'export")
+    profiling.add_arguments(r, explain=True)
+    s = sub.add_parser("status", help="affiche l'état de la dernière exécution")
+    s.add_argument("--state", default=STATE_FILE)
+    args = ap.parse_args(argv)
+
+    if args.command == "status":
+        state = load_state(args.state)
+        if state is None:
+            raise SystemExit(f"Aucun état dans {args.state}")
+        print(f"Exécution du {state['started_at']} ({state['src']}{', incrémentale' if state['incremental'] else ''})")
+        print_report(state)
+        return
+    if args.resume and (args.from_stage != STAGES[0] or args.skip):
+        ap.error("--resume reprend l'exécution précédente : pas de --from / --skip")
+    if args.fuzzy and args.workers > 1:
+        ap.error("--fuzzy : nettoyage en mémoire seulement (pas --workers)")
+    with profiling.run_report(args, "pipeline"):
+        run(args)
+
+if __name__ == "__main__":
+    main()
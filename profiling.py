@@ -0,0 +1,309 @@
+# profiling.py
+# Instrumentation optionnelle commune aux scripts (etl_bi_clean, etl_to_ods, build_dwh,
+# export_dwh_to_csv, pipeline), activée par --profile RAPPORT.json ; sinon rien n'est mesuré.
+#   - span(nom) / @profiled : durée, lignes en entrée / sortie, RSS courant et pic, par bloc
+#     (helpers de nettoyage colonne par colonne, étapes SQL de build_dwh, phases ODS, tables
+#     exportées…) ; les blocs s'imbriquent (chemin "clean/clean_text[nom]") et les threads
+#     lancés via bind() se rattachent au bloc qui les a lancés
+#   - --explain : execute() passe les instructions lourdes de build_dwh par
+#     EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) (qui les exécute) et garde les plans
+#   - --pyprofile cprofile | sample : chaque bloc de premier niveau (thread principal) sous
+#     cProfile (fichier .prof) ou échantillonné (toutes les piles de tous les threads, fichier
+#     .folded pour flamegraph / speedscope) ; fonctions les plus coûteuses dans le rapport
+# Un seul rapport JSON par exécution (écrit aussi en cas d'échec), avec un résumé par bloc
+# (appels, durée, lignes) pour comparer deux exécutions.
+import os, re, sys, json, time, pstats, cProfile, platform, resource, threading, functools, collections, contextlib
+
+SAMPLE_INTERVAL = 0.005   # --pyprofile sample : une pile toutes les 5 ms
+TOP_FUNCTIONS = 25
+
+# ========= Mémoire =========
+# Pic de RSS : sous Linux, écrire "5" dans /proc/self/clear_refs remet VmHWM (pic du
+# processus) au RSS courant ; ailleurs on retombe sur ru_maxrss, pic depuis le démarrage.
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _proc_status_mb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def peak_rss_mb(reset_ok=True):
+    if reset_ok:
+        peak = _proc_status_mb("VmHWM:")
+        if peak is not None:
+            return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 1024), 1)
+
+# ========= Exécution en cours =========
+class _Run:
+    def __init__(self, path, script, explain, pyprofile):
+        self.path, self.script, self.explain, self.pyprofile = path, script, explain, pyprofile
+        self.pid = os.getpid()   # processus fils (fork) : rien n'est mesuré
+        self.t0 = time.perf_counter()
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        self.spans, self.lock, self.local = [], threading.Lock(), threading.local()
+
+_run = None
+
+def _active():
+    return _run is not None and _run.pid == os.getpid()
+
+def enabled():
+    """Vrai si --profile est actif (dans ce processus)."""
+    return _active()
+
+def _stack():
+    if not hasattr(_run.local, "stack"):
+        _run.local.stack = []
+    return _run.local.stack
+
+def current_path():
+    """Chemin du bloc en cours dans ce thread ("" hors bloc ou profilage désactivé)."""
+    if not _active():
+        return ""
+    stack = _stack()
+    return stack[-1]["path"] if stack else getattr(_run.local, "parent", "")
+
+def bind(fn):
+    """fn exécuté dans un autre thread, rattaché au bloc en cours ici (pour ThreadPoolExecutor)."""
+    if not _active():
+        return fn
+    parent = current_path()
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        _run.local.parent = parent
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _run.local.parent = ""
+    return bound
+
+def _rows(value):
+    """Lignes d'un résultat : DataFrame / Series / tableau (shape), ou entier (lignes chargées)."""
+    shape = getattr(value, "shape", None)
+    if shape:
+        return int(shape[0])
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+@contextlib.contextmanager
+def span(name, rows_in=None):
+    """Mesure le bloc ; produit son enregistrement (rows_out, etc. à compléter par l'appelant)."""
+    if not _active():
+        yield {}
+        return
+    stack = _stack()
+    parent = stack[-1]["path"] if stack else getattr(_run.local, "parent", "")
+    rec = {"path": f"{parent}/{name}" if parent else name, "name": name, "thread": threading.current_thread().name,
+           "rows_in": rows_in, "rows_out": None}
+    top = not stack and not parent and threading.current_thread() is threading.main_thread()
+    reset_ok = reset_peak_rss() if top else True
+    profiler = _start_pyprofile() if top and _run.pyprofile else None
+    stack.append(rec)
+    start = time.perf_counter()
+    try:
+        yield rec
+    except BaseException as exc:
+        rec["error"] = type(exc).__name__
+        raise
+    finally:
+        rec["start_s"] = round(start - _run.t0, 4)
+        rec["wall_s"] = round(time.perf_counter() - start, 4)
+        stack.pop()
+        if profiler is not None:
+            rec["pyprofile"] = _stop_pyprofile(profiler, rec["path"])
+        rec["rss_mb"] = _proc_status_mb("VmRSS:")
+        rec["peak_rss_mb"] = peak_rss_mb(reset_ok)
+        with _run.lock:
+            _run.spans.append(rec)
+
+def note(**fields):
+    """Complète le bloc en cours (ex. note(rows_out=n))."""
+    if _active() and _stack():
+        _stack()[-1].update(fields)
+
+def profiled(fn=None, *, name=None):
+    """Décorateur : appel mesuré comme un bloc ; lignes = premier argument / résultat."""
+    if fn is None:
+        return lambda f: profiled(f, name=name)
+    label = name or fn.__name__
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _active():
+            return fn(*args, **kwargs)
+        with span(label, rows_in=_rows(args[0]) if args else None) as rec:
+            out = fn(*args, **kwargs)
+            if rec["rows_out"] is None:   # déjà renseigné par note(rows_out=…) dans fn
+                rec["rows_out"] = _rows(out)
+        return out
+    return wrapper
+
+# ========= EXPLAIN =========
+# Découpage en instructions : les ; dans les chaînes, blocs $$ et commentaires ne comptent pas
+_SQL_TOKEN = re.compile(r"'(?:[^']|'')*'|\$\$.*?\$\$|--[^\n]*|;", re.S)
+_EXPLAINABLE = re.compile(r"(?:\s|--[^\n]*)*(?:WITH|SELECT|INSERT|UPDATE|DELETE|"
+                          r"CREATE\s+(?:UNLOGGED\s+|TEMP(?:ORARY)?\s+)?TABLE\s+\S+\s+AS|CREATE\s+MATERIALIZED\s+VIEW)\b",
+                          re.I)
+_COMMENTS = re.compile(r"--[^\n]*")
+
+def split_sql(sql):
+    statements, start = [], 0
+    for m in _SQL_TOKEN.finditer(sql):
+        if m.group(0) == ";":
+            statements.append(sql[start:m.end()])
+            start = m.end()
+    statements.append(sql[start:])
+    return [s for s in statements if _COMMENTS.sub("", s).strip(" \t\r\n;")]
+
+def _plan_summary(plan):
+    root = plan["Plan"]
+    node = root["Plans"][0] if root["Node Type"] == "ModifyTable" and root.get("Plans") else root
+    return {"planning_ms": plan.get("Planning Time"), "execution_ms": plan.get("Execution Time"),
+            "rows": node.get("Actual Rows", 0) * node.get("Actual Loops", 1),
+            **{key: root.get(field, 0) for key, field in (
+                ("shared_hit_blocks", "Shared Hit Blocks"), ("shared_read_blocks", "Shared Read Blocks"),
+                ("shared_written_blocks", "Shared Written Blocks"), ("temp_read_blocks", "Temp Read Blocks"),
+                ("temp_written_blocks", "Temp Written Blocks"))}}
+
+def execute(cur, sql):
+    """cur.execute(sql) ; avec --explain, instruction par instruction, les requêtes passant par
+    EXPLAIN (ANALYZE, BUFFERS) : même effet, plans gardés dans le bloc en cours."""
+    if not (_active() and _run.explain):
+        return cur.execute(sql)
+    plans = []
+    for stmt in split_sql(sql):
+        if _EXPLAINABLE.match(stmt):
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + stmt)
+            plan = cur.fetchone()[0][0]
+            plans.append({"sql": stmt.strip(), **_plan_summary(plan), "plan": plan})
+        else:
+            cur.execute(stmt)
+    if _stack():
+        _stack()[-1].setdefault("plans", []).extend(plans)
+
+# ========= Profilage Python =========
+class _Sampler(threading.Thread):
+    """Relève la pile de chaque thread toutes les `interval` secondes (piles repliées)."""
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.interval, self.stacks, self.stopped = interval, collections.Counter(), threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join([names.get(tid, str(tid)), *reversed(stack)])] += 1
+
+def _start_pyprofile():
+    if _run.pyprofile == "sample":
+        sampler = _Sampler()
+        sampler.start()
+        return sampler
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def _artifact(path, ext):
+    stem, name = os.path.splitext(_run.path)[0], re.sub(r"[^\w.-]+", "_", path)
+    return f"{stem}.{name}{ext}"
+
+def _stop_pyprofile(profiler, path):
+    if isinstance(profiler, _Sampler):
+        profiler.stopped.set()
+        profiler.join()
+        out = _artifact(path, ".folded")
+        with open(out, "w", encoding="utf-8") as f:
+            for stack, n in profiler.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        leaves = collections.Counter()
+        for stack, n in profiler.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+        total = sum(leaves.values()) or 1
+        return {"mode": "sample", "file": out, "interval_s": profiler.interval, "samples": sum(leaves.values()),
+                "top_self": [{"function": fn, "samples": n, "share": round(n / total, 4)}
+                             for fn, n in leaves.most_common(TOP_FUNCTIONS)]}
+    profiler.disable()
+    out = _artifact(path, ".prof")
+    profiler.dump_stats(out)
+    stats = pstats.Stats(profiler).stats
+    top = sorted(stats.items(), key=lambda kv: kv[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return {"mode": "cprofile", "file": out,
+            "top_cumulative": [{"function": f"{func} ({os.path.basename(file)}:{line})", "calls": nc,
+                                "self_s": round(tt, 4), "cumulative_s": round(ct, 4)}
+                               for (file, line, func), (cc, nc, tt, ct, _) in top]}
+
+# ========= Rapport =========
+def add_arguments(ap, explain=False):
+    ap.add_argument("--profile", metavar="JSON", help="rapport de profilage (durées, lignes, mémoire par bloc)")
+    ap.add_argument("--pyprofile", choices=["cprofile", "sample"],
+                    help="avec --profile : étapes Python sous cProfile ou échantillonnées")
+    if explain:
+        ap.add_argument("--explain", action="store_true",
+                        help="avec --profile : EXPLAIN (ANALYZE, BUFFERS) des requêtes de build_dwh")
+
+def summary(spans):
+    """Par chemin de bloc : appels, durée cumulée, lignes, pic RSS."""
+    out = {}
+    for rec in spans:
+        s = out.setdefault(rec["path"], {"calls": 0, "wall_s": 0.0, "rows_in": None, "rows_out": None,
+                                         "peak_rss_mb": None})
+        s["calls"] += 1
+        s["wall_s"] = round(s["wall_s"] + rec["wall_s"], 4)
+        for key in ("rows_in", "rows_out"):
+            if rec.get(key) is not None:
+                s[key] = (s[key] or 0) + rec[key]
+        if rec.get("peak_rss_mb") is not None:
+            s["peak_rss_mb"] = max(s["peak_rss_mb"] or 0, rec["peak_rss_mb"])
+    return out
+
+def write_report(status):
+    report = {"script": _run.script, "argv": sys.argv, "status": status, "started_at": _run.started_at,
+              "wall_s": round(time.perf_counter() - _run.t0, 3), "python": platform.python_version(),
+              "platform": platform.platform(), "cpu_count": os.cpu_count(),
+              "options": {"explain": _run.explain, "pyprofile": _run.pyprofile},
+              "summary": summary(_run.spans),
+              "spans": sorted(_run.spans, key=lambda r: r["start_s"])}
+    tmp = _run.path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp, _run.path)
+    return _run.path
+
+@contextlib.contextmanager
+def run_report(args, script):
+    """Active le profilage si args.profile ; écrit le rapport en sortie (statut ok / failed)."""
+    global _run
+    if not getattr(args, "profile", None):
+        yield
+        return
+    os.makedirs(os.path.dirname(args.profile) or ".", exist_ok=True)
+    _run = _Run(args.profile, script, getattr(args, "explain", False), args.pyprofile)
+    status = "failed"
+    try:
+        yield
+        status = "ok"
+    finally:
+        path = write_report(status)
+        _run = None
+        print(f"🔬 Rapport de profilage : {path}")
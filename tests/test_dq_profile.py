@@ -0,0 +1,42 @@
+# tests/test_dq_profile.py
+import os, sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dq_profile import DQProfile, TOP_K
+
+def _columns(n=900_000, seed=0):
+    rng = np.random.default_rng(seed)
+    flat = pd.Series(rng.integers(0, 300_000, n)).map("v{}".format)          # ~3 lignes par valeur
+    skewed = pd.Series(np.minimum(rng.zipf(1.3, n), 100_000)).map("z{}".format)
+    return pd.DataFrame({"flat": flat, "skewed": skewed})
+
+def _top(profile, col):
+    return profile.to_dict()["colonnes"][col]["top"]
+
+def test_top_exact_in_memory():
+    df = _columns()
+    profile = DQProfile()
+    profile.observe(df)
+    for col in df:
+        vc = df[col].value_counts()
+        top = _top(profile, col)
+        assert [t["lignes"] for t in top] == vc.iloc[:TOP_K].tolist()
+        assert all(vc[t["valeur"]] == t["lignes"] == t["lignes_max"] for t in top)
+
+def test_top_bounds_after_merge():
+    df = _columns()
+    merged = DQProfile()
+    for block in np.array_split(df, 4):
+        part = DQProfile()
+        part.observe(block)
+        merged.merge(part)
+    for col in df:
+        vc = df[col].value_counts()
+        top = _top(merged, col)
+        assert all(t["lignes"] <= vc[t["valeur"]] <= t["lignes_max"] for t in top)
+    # valeurs nettement en tête : retrouvées dans l'ordre, comptes exacts
+    vc = df["skewed"].value_counts()
+    assert [t["valeur"] for t in _top(merged, "skewed")[:3]] == vc.index[:3].tolist()
+    assert [t["lignes"] for t in _top(merged, "skewed")[:3]] == vc.iloc[:3].tolist()
@@ -0,0 +1,31 @@
+# tests/test_etl_bi_clean.py
+import os, sys
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import etl_bi_clean as etl
+
+def _header_only(tmp_path):
+    src = tmp_path / "vide.csv"
+    src.write_text(",".join(etl.rename_map) + "\n", encoding="utf-8")
+    return str(src)
+
+def test_workers_header_only_source(tmp_path):
+    src = _header_only(tmp_path)
+    for name, extra in (("seq", []), ("par", ["--workers", "2"])):
+        etl.main([src, "--out-dir", str(tmp_path / name), "--no-cache", *extra])
+    seq = pd.read_csv(tmp_path / "seq" / etl.CLEAN_CSV)
+    par = pd.read_csv(tmp_path / "par" / etl.CLEAN_CSV)
+    assert par.empty
+    assert list(par.columns) == list(seq.columns)
+
+DATES = ["2023-01-05", "05/01/2023", "05-01-2023", "12/31/2023", "2023/01/05", "2023-1-5", "1/2/2023",
+         " 5/01/2023", "31/02/2023", "2023-01-05\n", "05/01/2023\n", "2023-01-05 ", "2023-01-05T10:00",
+         "5 janvier 2023", "n/a", "", None, float("nan"), pd.Timestamp("2023-01-05")]
+
+def test_parse_date_engines_identical():
+    s = pd.Series(DATES, dtype=object)
+    ref = s.apply(etl.parse_date)
+    vec = etl.parse_date_vec(s)
+    pd.testing.assert_series_equal(vec, ref.astype("datetime64[ns]"), check_names=False)
+    assert vec[DATES.index("2023-01-05\n")] == etl.parse_date("2023-01-05\n")
@@ -0,0 +1,21 @@
+# tests/test_fuzzy_dedup.py
+import os, sys
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import etl_bi_clean as etl
+import fuzzy_dedup
+
+def test_empty_frame():
+    df = pd.DataFrame({"nom": pd.Series([], dtype=object), "prenom": pd.Series([], dtype=object),
+                       "date_naissance": pd.Series([], dtype="datetime64[ns]"), "annee": pd.Series([], dtype="int64")})
+    out, stats = fuzzy_dedup.fuzzy_dedup(df)
+    assert out is df and out.empty
+    assert stats["eleves"] == 0 and stats["eleves_fusionnes"] == 0
+    fuzzy_dedup.print_stats(stats)
+
+def test_fuzzy_header_only_source(tmp_path):
+    src = tmp_path / "vide.csv"
+    src.write_text(",".join(etl.rename_map) + "\n", encoding="utf-8")
+    etl.main([str(src), "--out-dir", str(tmp_path), "--no-cache", "--fuzzy"])
+    assert pd.read_csv(tmp_path / etl.CLEAN_CSV).empty
@@ -0,0 +1,68 @@
+# tests/test_ingest_cache.py
+import os, sys, json
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ingest_cache
+
+def _setup(tmp_path):
+    src = tmp_path / "source.csv"
+    pd.DataFrame({"nom": ["Dupont", "Martin"] * 50, "annee": range(100)}).to_csv(src, index=False)
+    calls = []
+    def reader(path):
+        calls.append(path)
+        return pd.read_csv(path)
+    return str(src), str(tmp_path / "cache"), reader, calls
+
+def _entry(cache_dir):
+    with open(os.path.join(cache_dir, ingest_cache.INDEX), encoding="utf-8") as f:
+        return next(iter(json.load(f)["entries"].values()))
+
+def test_same_size_corruption_is_a_miss(tmp_path):
+    src, cache_dir, reader, calls = _setup(tmp_path)
+    ref = ingest_cache.cached_read(src, reader, cache_dir=cache_dir)
+    ingest_cache.cached_read(src, reader, cache_dir=cache_dir)
+    assert len(calls) == 1
+    path = os.path.join(cache_dir, _entry(cache_dir)["file"])
+    with open(path, "r+b") as f:   # fin du fichier remplacée par des zéros : même taille
+        f.seek(-64, os.SEEK_END)
+        f.write(b"\0" * 64)
+    assert ingest_cache.cached_frame_path(src, cache_dir=cache_dir) is None
+    df = ingest_cache.cached_read(src, reader, cache_dir=cache_dir)
+    assert len(calls) == 2
+    pd.testing.assert_frame_equal(df, ref)
+    assert ingest_cache.cached_frame_path(src, cache_dir=cache_dir) is not None
+
+def test_rehash_is_persisted(tmp_path, monkeypatch):
+    src, cache_dir, reader, calls = _setup(tmp_path)
+    ingest_cache.cached_read(src, reader, cache_dir=cache_dir)
+    st = os.stat(src)
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))   # même contenu, mtime changé
+    hashed = []
+    real = ingest_cache.file_sha256
+    monkeypatch.setattr(ingest_cache, "file_sha256", lambda p, *a: hashed.append(p) or real(p, *a))
+    for _ in range(3):
+        assert ingest_cache.cached_frame_path(src, cache_dir=cache_dir) is not None
+    assert hashed.count(src) == 1
+
+def test_hit_does_not_rehash_cache_file(tmp_path, monkeypatch):
+    src, cache_dir, reader, calls = _setup(tmp_path)
+    ingest_cache.cached_read(src, reader, cache_dir=cache_dir)
+    path = os.path.join(cache_dir, _entry(cache_dir)["file"])
+    hashed = []
+    real = ingest_cache.file_sha256
+    monkeypatch.setattr(ingest_cache, "file_sha256", lambda p, *a: hashed.append(p) or real(p, *a))
+    for _ in range(2):
+        ingest_cache.cached_read(src, reader, cache_dir=cache_dir)
+        assert ingest_cache.cached_frame_path(src, cache_dir=cache_dir) == path
+    assert len(calls) == 1
+    assert path not in hashed
+
+def test_truncated_cache_file_is_a_miss(tmp_path):
+    src, cache_dir, reader, calls = _setup(tmp_path)
+    ingest_cache.cached_read(src, reader, cache_dir=cache_dir)
+    path = os.path.join(cache_dir, _entry(cache_dir)["file"])
+    os.truncate(path, os.path.getsize(path) // 2)
+    assert ingest_cache.cached_frame_path(src, cache_dir=cache_dir) is None
+    ingest_cache.cached_read(src, reader, cache_dir=cache_dir)
+    assert len(calls) == 2